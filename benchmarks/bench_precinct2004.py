@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Benchmark the 2004 general election precinct canvass parser
+
+The precinct canvass has a row for every precinct in the state, each with
+twenty vote columns, so the per-row work in
+``openelexdata.us.ia.parser.precinct2004.ResultsState`` dominates its
+parse time.  The text of the canvass isn't kept in this repository, so the
+input is generated with the headings of the canvass and rows laid out under
+them.
+
+Takes the same options as ``bench_util.py``:
+
+    ./benchmarks/bench_precinct2004.py --save benchmarks/precinct2004.json
+    ./benchmarks/bench_precinct2004.py --compare benchmarks/precinct2004.json
+"""
+
+from io import StringIO
+
+from openelexdata.us.ia.parser.precinct2004 import ResultParser
+
+from bench_util import (BREAKS_2004_PRECINCT, COUNTIES, HEADER_2004_PRECINCT,
+    _layout_row, main)
+
+
+OFFICES_2004 = ["PRESIDENT", "US SENATE", "US REPRESENTATIVE", "IOWA SENATE",
+    "IOWA HOUSE"]
+
+OFFICE_HEADER_2004 = "GENERAL ELECTION      {}      IOWA DISTRICTS NUMBERS".format(
+    "      ".join(OFFICES_2004))
+
+def _precinct_rows(county_number, county, precincts):
+    for i in range(precincts):
+        votes = ["{:,}".format((37 * i + 11 * j + county_number) % 1500)
+            for j in range(20)]
+        # Not every precinct votes in every legislative race
+        if i % 3 == 0:
+            votes[12:16] = ["X"] * 4
+        yield _layout_row(BREAKS_2004_PRECINCT, [county.title(),
+            "{:02d}".format(county_number), "{} Precinct {}".format(
+                county.title(), i + 1)] + votes +
+            [str(i % 100 + 1), str(i % 50 + 1), str(county_number % 5 + 1)])
+
+def precinct_canvass(precincts=50):
+    """
+    Text of a precinct canvass with ``precincts`` rows for each county
+    """
+    lines = []
+    for n, county in enumerate(COUNTIES, 1):
+        lines.append(OFFICE_HEADER_2004)
+        lines.extend(HEADER_2004_PRECINCT)
+        lines.append("")
+        lines.extend(_precinct_rows(n, county, precincts))
+        lines.append("")
+
+    return "\n".join(lines) + "\n"
+
+CANVASS_2004_PRECINCT = precinct_canvass()
+
+
+def _parse_2004_precinct():
+    ResultParser(StringIO(CANVASS_2004_PRECINCT)).parse()
+
+
+BENCHMARKS = {
+    'parse_2004_precinct': _parse_2004_precinct,
+}
+
+
+if __name__ == "__main__":
+    main(BENCHMARKS, "Benchmark the 2004 precinct canvass parser", number=5)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks for the text layout functions in openelexdata.us.ia.util
+
+Every parser calls these functions for each header or row, so they should
+stay fast as they change.  The inputs are header lines from the 2002, 2004
+precinct and 2012 canvass summaries, and data rows laid out like them.
+
+Record a baseline before making a change:
+
+    ./benchmarks/bench_util.py --save benchmarks/baseline.json
+
+and compare against it afterwards:
+
+    ./benchmarks/bench_util.py --compare benchmarks/baseline.json
+
+Each benchmark is timed several times, in CPU time, and the median is
+compared, so one slow run doesn't count as a regression.  The comparison exits with a
+non-zero status if any benchmark is slower than the baseline by more than
+the threshold plus the spread of the timings, since a difference within the
+run-to-run noise isn't a regression.  Baselines depend on the machine, so
+record and compare them on the same one.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import timeit
+
+from openelexdata.us.ia.util import (district_word_to_number,
+    get_column_breaks, parse_fixed_widths, split_into_columns,
+    split_line_into_columns)
+
+
+# Result header of the 2002 general election Governor's race
+HEADER_2002 = [
+    "                Doug Gross     Steve Sukup   Bob Vander ",
+    "                                               Plaats     Write-In ",
+    "                 Republican    Republican                  Votes         Totals",
+    "                                              Republican",
+]
+
+# Column headings of the 2004 general election precinct canvass
+HEADER_2004_PRECINCT = [
+    "     COUNTY       CO #               PRECINCT NAME          DEM     REP     OTH   SC   DEM    REP      OTH   SC   DEM         REP    OTH SC     DEM     REP    OTH   SC   DEM     REP     OTH   SC   IA HOUSE IA SENATE US REP",
+]
+
+# Result header of the 2012 general election Secretary of State's race
+HEADER_2012 = [
+    "       County        Michael A. Mauro   Matt Schultz           Jake Porter                                            Write-in                           Over Votes     Under         Total"
+]
+
+COUNTIES = ["ADAIR", "ADAMS", "ALLAMAKEE", "APPANOOSE", "AUDUBON", "BENTON",
+    "BLACK HAWK", "BOONE", "BREMER", "BUCHANAN", "BUENA VISTA", "BUTLER",
+    "CALHOUN", "CARROLL", "CASS", "CEDAR", "CERRO GORDO", "CHEROKEE",
+    "CHICKASAW", "CLARKE"]
+
+# Columns of the 2004 precinct canvass, found from the positions of the
+# headings in HEADER_2004_PRECINCT
+BREAKS_2004_PRECINCT = [0, 18, 37, 60, 68, 76, 82, 87, 94, 103, 109, 114, 126,
+    133, 137, 144, 152, 159, 165, 170, 178, 186, 192, 197, 206, 216]
+
+def _layout_row(breaks, values):
+    return "".join(value.ljust(end - start) for value, start, end
+        in zip(values, breaks, breaks[1:] + [breaks[-1] + 8]))
+
+# Precinct rows laid out under HEADER_2004_PRECINCT
+ROWS_2004_PRECINCT = [_layout_row(BREAKS_2004_PRECINCT, [county, str(i + 1),
+        "{} Twp".format(county.title())] +
+        ["{:,}".format(37 * i + 11 * j) for j in range(20)] +
+        [str(i + 1), str(i // 2 + 1), str(i % 5 + 1)])
+    for i, county in enumerate(COUNTIES)]
+
+# County rows laid out like the 2000 county president canvass
+FIELDWIDTHS_2000 = [14, 11, 11, 13, 11, 15, 16, 18, 18, 15, 13, 6]
+ROWS_2000 = ["".join("{:>{}}".format(value, width)
+        for value, width in zip([county] + [str(100 + 13 * i + j)
+            for j in range(11)], FIELDWIDTHS_2000))
+    for i, county in enumerate(COUNTIES)]
+
+DISTRICT_WORDS = ["FIRST", "SIXTY-FIFTH", "NINETIETH", "TWENTY-THIRD",
+    "ONE HUNDREDTH", "FORTY-FOURTH"]
+
+
+def _split_rows_2004_precinct():
+    for row in ROWS_2004_PRECINCT:
+        split_line_into_columns(row, BREAKS_2004_PRECINCT)
+
+def _parse_fixed_widths_2000():
+    for row in ROWS_2000:
+        parse_fixed_widths(FIELDWIDTHS_2000, row)
+
+def _district_words():
+    for word in DISTRICT_WORDS:
+        district_word_to_number(word, " " if " " in word else "-")
+
+
+BENCHMARKS = {
+    'get_column_breaks_2002': lambda: get_column_breaks(HEADER_2002),
+    'get_column_breaks_2004_precinct':
+        lambda: get_column_breaks(HEADER_2004_PRECINCT),
+    'get_column_breaks_2012': lambda: get_column_breaks(HEADER_2012),
+    'split_into_columns_2002': lambda: split_into_columns(HEADER_2002,
+        [16, 31, 45, 58, 73]),
+    'split_line_into_columns_2004_precinct': _split_rows_2004_precinct,
+    'parse_fixed_widths_2000': _parse_fixed_widths_2000,
+    'district_word_to_number': _district_words,
+}
+
+
+def run(benchmarks, number=1000, repeat=15):
+    """
+    Time each benchmark
+
+    Returns:
+        Dictionary of the median time, in microseconds, of a single call to
+        each benchmark, and the spread of the times.  The spread is the
+        difference between the upper and lower quartiles.
+    """
+    timings = {}
+    for name in sorted(benchmarks):
+        # Time on the CPU rather than the clock, so other processes running
+        # at the same time don't count
+        times = [t / number * 1e6 for t in timeit.repeat(benchmarks[name],
+            timer=time.process_time, number=number, repeat=repeat)]
+        quartiles = statistics.quantiles(times, n=4)
+        timings[name] = {
+            'median': statistics.median(times),
+            'spread': quartiles[2] - quartiles[0],
+        }
+
+    return timings
+
+def _timing(value):
+    # Baselines saved before the spread was recorded are a bare time
+    if isinstance(value, dict):
+        return value['median'], value['spread']
+
+    return value, 0.0
+
+def compare(timings, baseline, threshold):
+    """
+    Get the benchmarks that are slower than their baseline
+
+    A benchmark has regressed if its median is more than ``threshold``
+    slower than the baseline's, plus the spread of both sets of timings.
+
+    Returns:
+        List of tuples of the name, baseline time and new time of each
+        benchmark that regressed.
+    """
+    regressions = []
+    for name, timing in sorted(timings.items()):
+        if name not in baseline:
+            continue
+
+        before, before_spread = _timing(baseline[name])
+        after, after_spread = _timing(timing)
+        if after > before * (1 + threshold) + before_spread + after_spread:
+            regressions.append((name, before, after))
+
+    return regressions
+
+
+def main(benchmarks, description, number=1000, repeat=15):
+    """
+    Run benchmarks from the command line, saving or comparing their timings
+    """
+    arg_parser = argparse.ArgumentParser(description=description)
+    arg_parser.add_argument('--save', metavar="PATH",
+        help="save the timings as a baseline")
+    arg_parser.add_argument('--compare', metavar="PATH",
+        help="compare the timings to a saved baseline")
+    arg_parser.add_argument('--threshold', type=float, default=0.25,
+        help="fraction a benchmark may be slower than its baseline. "
+             "Default is 0.25")
+    arg_parser.add_argument('--number', type=int, default=number,
+        help="calls per timing. Default is {}".format(number))
+    arg_parser.add_argument('--repeat', type=int, default=repeat,
+        help="timings of each benchmark. Default is {}".format(repeat))
+    arg_parser.add_argument('benchmarks', nargs='*',
+        help="names of the benchmarks to run. Default is all of them")
+    args = arg_parser.parse_args()
+
+    if args.benchmarks:
+        benchmarks = {name: benchmarks[name] for name in args.benchmarks}
+
+    timings = run(benchmarks, number=args.number, repeat=args.repeat)
+    for name, timing in sorted(timings.items()):
+        print("{:<40} {:>10.2f} us +/- {:.2f}".format(name, timing['median'],
+            timing['spread']))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(timings, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(timings, baseline, args.threshold)
+        for name, before, after in regressions:
+            sys.stderr.write("{} regressed from {:.2f} us to {:.2f} us\n".format(
+                name, before, after))
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(BENCHMARKS, "Benchmark the text layout functions in util")
@@ -2,12 +2,14 @@
 
 import csv
 import re
+import sys
 
 from openelexdata.us.ia import BaseParser, ParserState, arg_parser
-from openelexdata.us.ia.util import parse_fixed_widths
+from openelexdata.us.ia.util import FixedWidthLayout
 
 
 fieldwidths = [14, 11, 11, 13, 11, 15, 16, 18, 18, 15, 13, 6]
+layout = FixedWidthLayout(fieldwidths)
 
 class RootState(ParserState):
     name = 'root'
@@ -29,7 +31,7 @@ class HeaderState(ParserState):
             return
 
         if 'candidates' not in self._context:
-            cols = parse_fixed_widths(fieldwidths, line[:-1])
+            cols = layout.unpack_line(line[:-1])
             self._header_bits.append(cols)
             
         if stripped.startswith("Lieberman"):
@@ -92,7 +94,7 @@ class ResultsState(ParserState):
                 'party': candidates[i][1],
                 'reporting_level': "county",
                 'jurisdiction': county,
-                'votes': cols[i + 1].replace(',', ''),
+                'votes': self._context.convert_votes(cols[i + 1]),
             })
         
         return results
@@ -116,11 +118,11 @@ class ResultParser(BaseParser):
         self._register_state(ResultsState(self))
         self._current_state = self._get_state('root')
 
-    def parse(self):
-        for line in self.infile:
-            # Don't strip the line.  We're going to do a fixed-width parse
-            # of header rows
-            self.handle_line(line)
+    def parse_line(self, line):
+        # Don't strip the line.  We're going to do a fixed-width parse
+        # of header rows
+        self.raw_line = line
+        self.handle_line(line)
 
 
 fields = [
@@ -149,3 +151,5 @@ if __name__ == "__main__":
     writer.writeheader()
     for result in parser.results:
         writer.writerow(result)
+
+    parser.vote_converter.report(sys.stderr)
@@ -10,7 +10,7 @@ HEADER_PREFIX_RE = re.compile(r'^(JUNE 6, 2000|PRIM CANV)')
 
 class RootState(ParserState):
     name = 'root'
-    office_re = re.compile(r'^(?P<office>U\.S\. REPRESEN[TA]+TIVE|STATESENATOR|STATE REPRESENTATIVE)\s+(?P<district>\S+)\s+DISTRICT$')
+    office_re = re.compile(r'^(?P<office>U\.S\. REPRESEN[TA]+TIVE|STATESENATOR|STATE REPRESENTATIVE)\s+(?P<district>\S+(?: \S+)?)\s+DISTRICT$')
 
     def handle_line(self, line):
         m = self.office_re.match(line)
@@ -18,12 +18,6 @@ class RootState(ParserState):
             self._context['office'] = m.group('office')
             self._context['district'] = district_word_to_number(m.group('district'))
             self._context.change_state('contest')
-        elif line == "STATE REPRESENTATIVE ONE HUNDREDRETH DISTRICT":
-            # Keep self.office_re simple and just handle the one exception
-            # explicitly
-            self._context['office'] = "STATE_REPRESENTATIVE"
-            self._context['district'] = 100
-            self._context.change_state('contest')
 
             
 class ContestState(ParserState):
@@ -4,23 +4,45 @@ Parse 2004 county-level primary and general election results.
 """
 
 import csv
+import sys
 
-from openelexdata.us.ia import arg_parser
+from openelexdata.us.ia import (add_binary_argument,
+    add_checkpoint_arguments, add_profile_argument, arg_parser,
+    start_checkpoints)
 from openelexdata.us.ia.parser.post2002 import ResultParser, fields
 
 if __name__ == "__main__":
+    arg_parser.add_argument("--processes", type=int,
+        help="parse pages in parallel using this many worker processes")
+    add_binary_argument(arg_parser)
+    add_profile_argument(arg_parser)
+    add_checkpoint_arguments(arg_parser)
     args = arg_parser.parse_args()
 
-    parser = ResultParser(args.infile)
-    writer = csv.DictWriter(args.outfile, fields)
+    infile = args.infile.buffer if args.binary else args.infile
+    parser = ResultParser(infile)
+    if args.profile:
+        parser.enable_profiling(outfile=args.profile)
+    start_checkpoints(arg_parser, args, parser)
+
+    # The results are records whose values() are in the order of fields
+    writer = csv.writer(args.outfile)
+    writer.writerow(fields)
     try:
-        parser.parse()
+        if args.processes:
+            parser.parse_pages(args.processes)
+            results = parser.results
+        else:
+            # Write rows as they're parsed rather than after the whole input
+            # has been consumed
+            results = parser.iter_results()
+
+        for result in results:
+            writer.writerow(result.values())
     except Exception:
         msg = "Exception at line {} of input file, in state {}\n"
         print(msg.format(parser.line_number, parser.current_state.name))
         print("Line: {}".format(parser.current_line))
         raise
 
-    writer.writeheader()
-    for result in parser.results:
-        writer.writerow(result)
+    parser.vote_converter.report(sys.stderr)
@@ -34,6 +34,7 @@ class RootState(ParserState):
 
 class PageHeader(ParserState):
     name = 'page_header'
+    skip_unless = re.compile(r'.*?(PRIMARY|OFFICIAL RESULTS)')
 
     def enter(self):
         self.handle_line(self._context.current_line)
@@ -9,7 +9,7 @@ contest_re = re.compile(r'(?P<office>United States Representative|'
         'Secretary of State|Auditor of State|Treasurer of State|'
         'Secretary of Agriculture|Attorney General|State Senator|'
         'State Representative)'
-        '( District (?P<district_num>\d{1,3})|)')
+        r'( District (?P<district_num>\d{1,3})|)')
 whitespace_re = re.compile(r'\s{2,}')
 
 def matches_page_header(line):
@@ -90,8 +90,8 @@ class Results(ParserState):
         try:
             assert len(cols) == len(self._context['candidates']) + 1
         except AssertionError:
-            print cols
-            print self._context['candidates']
+            print(cols)
+            print(self._context['candidates'])
 
         jurisdiction = cols[0]
 
@@ -5,7 +5,9 @@ import re
 
 from openelexdata.us.ia import arg_parser
 from openelexdata.us.ia import BaseParser, ParserState
-from openelexdata.us.ia.util import get_column_breaks, split_into_columns 
+from openelexdata.us.ia.parser.fixups import load_fixups
+from openelexdata.us.ia.util import (get_column_breaks, header_layouts,
+    split_into_columns)
 
 contest_re = re.compile(r'(?P<office>Governor|Secretary of Agriculture|'
         'Secretary of State|Attorney General|Auditor of State|'
@@ -33,6 +35,7 @@ class RootState(ParserState):
 
 class PageHeader(ParserState):
     name = 'page_header'
+    skip_unless = ("Election",)
 
     def handle_line(self, line):
         if line.startswith("Election"):
@@ -67,6 +70,9 @@ class ContestHeader(ParserState):
 class ResultsHeader(ParserState):
     name = 'results_header'
 
+    # Known bad candidate names
+    fixups = load_fixups('2008_primary')
+
     def enter(self):
         self.header_lines = []
         self.handle_line(self._context.current_line)
@@ -78,7 +84,8 @@ class ResultsHeader(ParserState):
             self.header_lines.append(self._context.raw_line)
 
     def exit(self):
-        candidates, parties = self.parse_header_lines(self.header_lines)
+        candidates, parties = header_layouts.lookup(type(self),
+            self.header_lines, self.parse_header_lines)
         self._context['candidates'] = candidates
         if 'party' not in self._context:
             self._context['parties'] = parties
@@ -128,12 +135,11 @@ class ResultsHeader(ParserState):
         return merged_cols
 
     def clean_candidate(self, candidate):
-        if candidate == "CHRISTOPHE R REED":
-            # PDF and text conversion break the final "R" of "CHRISTOPHER"
-            # across 2 lines.  I'm pretty sure the candidate's name is
-            # Christopher and not Christophe. See 
-            # http://en.wikipedia.org/wiki/Christopher_Reed
-            return "CHRISTOPHER REED"
+        # Candidate names that PDF and text conversion mangle, like
+        # "CHRISTOPHE R REED"
+        fix = self.fixups.lookup(candidate)
+        if fix is not None and fix['action'] == 'replace':
+            return fix['value']
 
         return candidate
 
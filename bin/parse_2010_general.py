@@ -5,7 +5,8 @@ import re
 
 from openelexdata.us.ia import arg_parser
 from openelexdata.us.ia import BaseParser, ParserState
-from openelexdata.us.ia.util import get_column_breaks, split_into_columns 
+from openelexdata.us.ia.util import (ColumnBreakAccumulator, get_column_breaks,
+    header_layouts, split_into_columns)
 
 contest_re = re.compile(r'(?P<office>Governor|Secretary of Agriculture|'
         'Secretary of State|Attorney General|Auditor of State|'
@@ -30,6 +31,7 @@ class RootState(ParserState):
 
 class PageHeader(ParserState):
     name = 'page_header'
+    skip_unless = "General Election"
 
     def handle_line(self, line):
         if "General Election" in line:
@@ -57,6 +59,7 @@ class ResultsHeader(ParserState):
 
     def enter(self):
         self.header_lines = []
+        self.column_breaks = ColumnBreakAccumulator()
         self.handle_line(self._context.current_line)
 
     def handle_line(self, line):
@@ -64,14 +67,19 @@ class ResultsHeader(ParserState):
             self._context.change_state('results') 
         else:
             self.header_lines.append(self._context.raw_line)
+            self.column_breaks.add(self._context.raw_line)
 
     def exit(self):
-        candidates, parties = self.parse_header_lines(self.header_lines)
+        breaks = self.column_breaks.breaks
+        candidates, parties = header_layouts.lookup(type(self),
+            self.header_lines, lambda lines: self.parse_header_lines(lines,
+                breaks))
         self._context['candidates'] = candidates
         self._context['parties'] = parties
 
-    def parse_header_lines(self, lines):
-        breaks = get_column_breaks(lines)
+    def parse_header_lines(self, lines, breaks=None):
+        if breaks is None:
+            breaks = get_column_breaks(lines)
         parsed_lines = split_into_columns(lines, breaks)
 
         # Initialize the candidate and party lists.
@@ -32,6 +32,7 @@ class RootState(ParserState):
 
 class PageHeader(ParserState):
     name = 'page_header'
+    skip_unless = ("Election",)
 
     def handle_line(self, line):
         if line.startswith("Election"):
@@ -4,10 +4,12 @@
 
 import csv
 import re
+import sys
 
 from openelexdata.us.ia import arg_parser
 from openelexdata.us.ia import BaseParser, ParserState
-from openelexdata.us.ia.util import get_column_breaks, split_into_columns 
+from openelexdata.us.ia.util import (ColumnBreakAccumulator, get_column_breaks,
+    header_layouts, split_into_columns)
 
 
 office_re = re.compile(r'(President/Vice President|'
@@ -33,6 +35,7 @@ class RootState(ParserState):
 
 class PageHeader(ParserState):
     name = 'page_header'
+    skip_unless = "2012 GENERAL ELECTION CANVASS SUMMARY"
 
     def handle_line(self, line):
         if line == "2012 GENERAL ELECTION CANVASS SUMMARY":
@@ -68,6 +71,7 @@ class ResultsHeader(ParserState):
 
     def enter(self):
         self.header_lines = []
+        self.column_breaks = ColumnBreakAccumulator()
 
     def handle_line(self, line):
         if line == "" and len(self.header_lines) > 1:
@@ -76,6 +80,7 @@ class ResultsHeader(ParserState):
 
         if line:
             self.header_lines.append(self._context.raw_line)
+            self.column_breaks.add(self._context.raw_line)
 
         # In some contests with long party names, there aren't any empty lines
         # betwee the header and the results.  Look for specific words to know
@@ -84,12 +89,16 @@ class ResultsHeader(ParserState):
             self._context.change_state('results') 
 
     def exit(self):
-        candidates, parties = self.parse_header_lines(self.header_lines)
+        breaks = self.column_breaks.breaks
+        candidates, parties = header_layouts.lookup(type(self),
+            self.header_lines, lambda lines: self.parse_header_lines(lines,
+                breaks))
         self._context['candidates'] = candidates
         self._context['parties'] = parties
 
-    def parse_header_lines(self, lines):
-        breaks = get_column_breaks(lines)
+    def parse_header_lines(self, lines, breaks=None):
+        if breaks is None:
+            breaks = get_column_breaks(lines)
         parsed_lines = split_into_columns(lines, breaks)
         candidates = ["" for i in range(len(parsed_lines[0]))]
         parties = ["" for i in range(len(parsed_lines[0]))]
@@ -175,7 +184,7 @@ class Results(ParserState):
                 'reporting_level': "county", 
                 'jurisdiction': self._county, 
                 'vote_type': self._vote_type,
-                'votes': cols[i].replace(',', ''), 
+                'votes': self._context.convert_votes(cols[i]),
             })
 
         if cols[0] == "Total":
@@ -220,3 +229,5 @@ if __name__ == "__main__":
     writer.writeheader()
     for result in parser.results:
         writer.writerow(result)
+
+    parser.vote_converter.report(sys.stderr)
@@ -7,7 +7,8 @@ import re
 
 from openelexdata.us.ia import arg_parser
 from openelexdata.us.ia import BaseParser, ParserState
-from openelexdata.us.ia.util import get_column_breaks, split_into_columns 
+from openelexdata.us.ia.util import (get_column_breaks, header_layouts,
+    split_into_columns)
 
 
 office_re = re.compile(r'State (Senator|Representative)')
@@ -76,7 +77,8 @@ class ResultsHeader(ParserState):
             self.header_lines.append(self._context.raw_line)
 
     def exit(self):
-        candidates, parties = self.parse_header_lines(self.header_lines)
+        candidates, parties = header_layouts.lookup(type(self),
+            self.header_lines, self.parse_header_lines)
         self._context['candidates'] = candidates
         self._context['parties'] = parties
 
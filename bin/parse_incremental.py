@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Reparse a hand-edited input file, only reparsing contests that changed.
+
+The parser is either a module, like openelexdata.us.ia.parser.post2002, or
+the path to one of the parsing scripts in this directory.  It must define
+``ResultParser`` and ``fields``.
+
+Example:
+
+    ./bin/parse_incremental.py bin/parse_2006_general.py \
+        txt/20061107__ia__general__county.txt \
+        2006/20061107__ia__general__county.csv
+
+The first run parses the whole file and writes a contest index next to the
+output file.  Later runs use the index to splice reparsed contests into the
+existing output.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import os.path
+import sys
+
+from openelexdata.us.ia.parser.incremental import parse_incremental
+
+
+def load_parser_module(spec):
+    if spec.endswith(".py") or os.path.sep in spec:
+        module_spec = importlib.util.spec_from_file_location("_parser_script",
+            spec)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        return module
+
+    return importlib.import_module(spec)
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("parser",
+        help="parser module name or path to a parsing script")
+    arg_parser.add_argument("infile", help="input filename")
+    arg_parser.add_argument("outfile", help="output filename")
+    arg_parser.add_argument("--index",
+        help="contest index filename. Defaults to OUTFILE.index.json")
+    args = arg_parser.parse_args()
+
+    module = load_parser_module(args.parser)
+    reparsed = parse_incremental(module.ResultParser, module.fields,
+        args.infile, args.outfile, args.index)
+    if reparsed is None:
+        sys.stderr.write("Parsed entire file\n")
+    else:
+        sys.stderr.write("Reparsed {} changed contests\n".format(reparsed))
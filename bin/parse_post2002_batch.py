@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Parse many county-level canvass summaries, from 2002 on, in parallel.
+
+Input files are text files, or PDFs that are converted with
+``pdftotext -layout`` as they're parsed.  Arguments can be glob patterns.
+Each file is parsed in a worker process with the parser used by
+``bin/parse_2002.py`` and ``bin/parse_2004.py``.  An error in one file is
+reported, with the line and parser state where it happened, and the other
+files are still parsed.
+
+With ``--outdir``, the results of each file are written to a CSV file of the
+same name in that directory.  Otherwise, the results of all the files are
+written, in the order of the arguments, as one CSV stream.
+
+Example:
+
+    ./bin/parse_post2002_batch.py --outdir 2002 'pdf/2002*__county.pdf'
+"""
+
+import argparse
+import csv
+import glob
+import multiprocessing
+import os.path
+import subprocess
+import sys
+from io import StringIO
+
+from openelexdata.us.ia.parser.post2002 import ResultParser, fields
+
+
+def read_input(path):
+    """Get the text of an input file, converting PDFs to text"""
+    if path.lower().endswith(".pdf"):
+        return subprocess.check_output(["pdftotext", "-layout", path, "-"],
+            universal_newlines=True)
+
+    with open(path) as f:
+        return f.read()
+
+def output_path(path, outdir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(outdir, name + ".csv")
+
+def parse_file(job):
+    """
+    Parse one input file
+
+    Args:
+        job: Tuple of the input path and the output directory.  If the
+            directory is None, the results are returned instead of written.
+
+    Returns:
+        A tuple of the input path, the list of result rows, or the number of
+        rows written if there's an output directory, an error message or
+        None, and the parser's VoteConverter, with any vote counts that
+        couldn't be converted.  Errors parsing the file or writing its
+        results are returned as the error message rather than raised.
+    """
+    path, outdir = job
+    parser = None
+    try:
+        parser = ResultParser(StringIO(read_input(path)))
+        parser.parse()
+    except Exception as e:
+        if parser is None:
+            msg = "{}: {}".format(path, e)
+        else:
+            msg = ("{}: exception at line {} of input file, in state {}: "
+                "{!r}\nLine: {}".format(path, parser.line_number,
+                parser.current_state.name, e, parser.current_line))
+        return path, None, msg, None
+
+    rows = [result.values() for result in parser.results]
+    if outdir is None:
+        return path, rows, None, parser.vote_converter
+
+    outfile_path = output_path(path, outdir)
+    try:
+        with open(outfile_path, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            writer.writerows(rows)
+    except OSError as e:
+        msg = "{}: couldn't write results to {}: {}".format(path,
+            outfile_path, e)
+        return path, None, msg, None
+
+    return path, len(rows), None, parser.vote_converter
+
+def expand_patterns(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            sys.stderr.write("No files match {}\n".format(pattern))
+        paths.extend(matches)
+
+    return paths
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("inputs", nargs='+',
+        help="input text or PDF files, or glob patterns matching them")
+    arg_parser.add_argument("--outdir",
+        help="write a CSV file for each input file to this directory")
+    arg_parser.add_argument("--outfile", type=argparse.FileType('w'),
+        default=sys.stdout,
+        help="output filename for the merged results. Defaults to stdout")
+    arg_parser.add_argument("--processes", type=int,
+        help="number of worker processes. Defaults to the number of CPUs")
+    args = arg_parser.parse_args()
+
+    if args.outdir is not None:
+        # Fail before starting the workers rather than once for every file
+        try:
+            os.makedirs(args.outdir, exist_ok=True)
+        except OSError as e:
+            arg_parser.error("can't create --outdir {}: {}".format(
+                args.outdir, e))
+
+    paths = expand_patterns(args.inputs)
+    jobs = [(path, args.outdir) for path in paths]
+
+    writer = None
+    if args.outdir is None:
+        writer = csv.writer(args.outfile)
+        writer.writerow(fields)
+
+    failed = 0
+    with multiprocessing.Pool(args.processes) as pool:
+        # Results come back in the order of the inputs
+        for path, rows, error, votes in pool.imap(parse_file, jobs):
+            if error is not None:
+                failed += 1
+                sys.stderr.write(error + "\n")
+                continue
+
+            votes.report(sys.stderr, path)
+            if writer is not None:
+                writer.writerows(rows)
+            else:
+                sys.stderr.write("Wrote {} results to {}\n".format(rows,
+                    output_path(path, args.outdir)))
+
+    if failed:
+        sys.stderr.write("{} of {} files failed\n".format(failed, len(paths)))
+        sys.exit(1)
@@ -8,3 +8,54 @@ arg_parser.add_argument("infile", nargs='?', type=argparse.FileType('r'),
     default=sys.stdin, help="input filename")
 arg_parser.add_argument("outfile", nargs='?', type=argparse.FileType('w'), 
     default=sys.stdout, help="output filename")
+
+
+def add_binary_argument(arg_parser):
+    """
+    Add the ``--binary`` option to a driver's arguments
+
+    Only drivers that pass ``args.infile.buffer`` to their parser when it's
+    set should add it.
+    """
+    arg_parser.add_argument("--binary", action='store_true',
+        help="read the input file as bytes, only decoding lines that are used")
+
+
+def add_profile_argument(arg_parser):
+    """
+    Add the ``--profile`` option to a driver's arguments
+
+    Only drivers that pass the file to ``enable_profiling()`` should add it.
+    """
+    arg_parser.add_argument("--profile", type=argparse.FileType('w'),
+        help="write per-state line counts and timings as JSON to this file")
+
+
+def add_checkpoint_arguments(arg_parser):
+    """
+    Add the options for checkpointing and resuming a parse to a driver's
+    arguments
+
+    Drivers that add them should pass the parsed arguments to
+    ``start_checkpoints()``.
+    """
+    arg_parser.add_argument("--checkpoint",
+        help="periodically save the parser's progress to this file")
+    arg_parser.add_argument("--checkpoint-every", type=int, default=1000,
+        help="number of input lines between checkpoints")
+    arg_parser.add_argument("--resume", action='store_true',
+        help="resume parsing from the file given by --checkpoint")
+
+
+def start_checkpoints(arg_parser, args, parser):
+    """
+    Resume a parse and turn on checkpoints, as asked for by the options
+    added by ``add_checkpoint_arguments()``
+    """
+    if args.resume and not args.checkpoint:
+        arg_parser.error("--resume requires --checkpoint")
+
+    if args.checkpoint:
+        if args.resume:
+            parser.resume(args.checkpoint)
+        parser.enable_checkpoints(args.checkpoint, args.checkpoint_every)
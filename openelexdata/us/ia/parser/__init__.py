@@ -1 +1,2 @@
-from openelexdata.us.ia.parser.base import ParserState, BaseParser
+from openelexdata.us.ia.parser.base import (ParserState, BaseParser,
+    StateTransitionError, Result, result_type)
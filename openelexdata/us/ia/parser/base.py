@@ -1,4 +1,178 @@
+import copy
+import heapq
+import io
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import sys
+from collections.abc import Mapping
+from io import StringIO
+from itertools import islice
+from operator import attrgetter, methodcaller
+from timeit import default_timer
+
+from openelexdata.us.ia.util import VoteConverter
+
+
+class Result(Mapping):
+    """
+    Base class for compact result records created by ``result_type()``
+
+    Records store their values in slots rather than a per-row dictionary but
+    behave like a mapping of field names to values, so they can be passed to
+    ``csv.DictWriter`` and compared with dictionaries.  Fields that aren't set
+    are None.  A field's value can be replaced with item assignment, but
+    fields can't be added or removed.
+    """
+    __slots__ = ()
+    fields = ()
+
+    def __getitem__(self, key):
+        if key in self._keys:
+            return getattr(self, key)
+
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._keys:
+            raise KeyError(key)
+
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        # csv.DictWriter reads every field with get(), so skip Mapping.get()
+        # going through __getitem__() and catching KeyError
+        if key in self._keys:
+            return getattr(self, key)
+
+        return default
+
+    def values(self):
+        """
+        Get the values of the fields as a tuple, in the order of ``fields``
+
+        Writing this with ``csv.writer`` is cheaper than writing the record
+        with ``csv.DictWriter``.
+        """
+        return self._values(self)
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def keys(self):
+        return self._keys
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(field, getattr(self, field))
+            for field in self.fields))
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, field) for field in self.fields))
+
+
+def _values_getter(fields):
+    """
+    Get a function returning the values of a record's fields as a tuple
+    """
+    if len(fields) < 2:
+        # attrgetter() only returns a tuple for two or more attributes
+        return lambda record: tuple(getattr(record, field)
+            for field in fields)
+
+    return attrgetter(*fields)
+
+
+def result_type(typename, fields):
+    """
+    Create a compact record type for results with the given fields
+
+    Args:
+        typename: Name of the new class.
+        fields: List of field names, usually a parser module's ``fields``.
+
+    Returns:
+        A subclass of Result whose constructor takes the field values as
+        positional or keyword arguments.
+    """
+    fields = tuple(fields)
+    # Generate the constructor, like collections.namedtuple does, so setting
+    # up a record doesn't loop over the fields
+    source = "def __init__(self, {}):\n".format(
+        ", ".join("{}=None".format(field) for field in fields))
+    for field in fields:
+        source += "    self.{0} = {0}\n".format(field)
+    namespace = {}
+    exec(source, namespace)
+
+    cls = type(typename, (Result,), {
+        '__slots__': fields,
+        '__init__': namespace['__init__'],
+        'fields': fields,
+        # A dict view, so DictWriter's check for extra keys stays cheap
+        '_keys': dict.fromkeys(fields).keys(),
+        '_values': staticmethod(_values_getter(fields)),
+    })
+    # Make the records picklable, for parse_pages()
+    cls.__module__ = sys._getframe(1).f_globals.get('__name__', __name__)
+    return cls
+
+
+class StringTable(object):
+    """
+    Dictionary encoding of repeated strings
+
+    Each distinct value is stored once and assigned a small integer code.
+    """
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value):
+        """Get the code for a value, adding it to the table if needed"""
+        try:
+            return self._codes[value]
+        except KeyError:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+            return code
+
+    def decode(self, code):
+        return self.values[code]
+
+    def intern(self, value):
+        """Get the table's copy of a value, adding it if needed"""
+        return self.values[self.encode(value)]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class StateTransitionError(ValueError):
+    """Raised when a state changes to a state it doesn't declare"""
+
+
 class ParserState(object):
+    # Subclasses that keep values on the instance should list them in their
+    # own ``__slots__``.  Otherwise their instances get a ``__dict__``
+    # anyway.
+    __slots__ = ('_context',)
+
+    # Names of the states this state can change to.  None allows changing to
+    # any registered state.
+    transitions = None
+
+    # Lines this state can act on.  Other lines are counted but not passed
+    # to ``handle_line()``.  This can be a tuple of prefixes, a string the
+    # line must contain or a compiled regex that must match the start of the
+    # line.  None passes every line to ``handle_line()``.
+    skip_unless = None
+
     def __init__(self, context):
         self._context = context
 
@@ -11,47 +185,273 @@ class ParserState(object):
     def exit(self):
         pass
 
+    def restore(self):
+        """
+        Called when a parser's context is restored with this as the current
+        state
+
+        States that keep derived values on the instance, rather than in the
+        context, should rebuild them here.
+        """
+        pass
+
+class StateProfile(object):
+    """
+    Per-state line counts, timings and transition counts for a parse
+
+    Args:
+        slowest: Number of slowest lines to keep.
+    """
+    def __init__(self, slowest=10):
+        self.slowest = slowest
+        self.states = {}
+        self._slowest_lines = []
+
+    def _get_stats(self, name):
+        try:
+            return self.states[name]
+        except KeyError:
+            stats = self.states[name] = {
+                'lines': 0,
+                'seconds': 0.0,
+                'entered': 0,
+                'transitions': {},
+            }
+            return stats
+
+    def record_line(self, state_name, line_number, line, elapsed):
+        stats = self._get_stats(state_name)
+        stats['lines'] += 1
+        stats['seconds'] += elapsed
+
+        item = (elapsed, line_number, state_name, line)
+        if len(self._slowest_lines) < self.slowest:
+            heapq.heappush(self._slowest_lines, item)
+        elif elapsed > self._slowest_lines[0][0]:
+            heapq.heapreplace(self._slowest_lines, item)
+
+    def record_transition(self, from_name, to_name):
+        transitions = self._get_stats(from_name)['transitions']
+        transitions[to_name] = transitions.get(to_name, 0) + 1
+        self._get_stats(to_name)['entered'] += 1
+
+    @property
+    def slowest_lines(self):
+        return [{
+                'line_number': line_number,
+                'state': state_name,
+                'seconds': elapsed,
+                'line': line,
+            }
+            for elapsed, line_number, state_name, line
+            in sorted(self._slowest_lines, reverse=True)]
+
+    def as_dict(self):
+        return {
+            'states': self.states,
+            'slowest_lines': self.slowest_lines,
+        }
+
+    def dump(self, outfile):
+        json.dump(self.as_dict(), outfile, indent=2, sort_keys=True)
+        outfile.write("\n")
+
+
 class StateManager(dict):
     def __init__(self):
         self._line_number = 0
         self._current_line = None
         self._previous_line = None
         self._states = {}
+        self._compiled = False
+        self._current = None
+        self._previous = None
+        self._next = None
+        self._profile = None
+        self._transition_hooks = []
 
     def _register_state(self, state):
         self._states[state.name] = state
+        self._compiled = False
 
     def _get_state(self, name):
         return self._states[name]
 
+    def _compile_states(self):
+        """
+        Build the dispatch tables used when handling lines and changing states
+
+        Each registered state is assigned an integer slot.  The bound
+        ``handle_line``, ``enter`` and ``exit`` methods and the set of slots
+        the state is allowed to change to are cached by slot, so dispatching
+        a line or changing state doesn't have to look anything up by name.
+
+        This is called automatically when the initial state is set, and again
+        on the next state change if a state has been registered since.
+        """
+        names = list(self._states)
+        index = dict((name, i) for i, name in enumerate(names))
+        states = [self._states[name] for name in names]
+        allowed = []
+        for state in states:
+            if state.transitions is None:
+                allowed.append(None)
+                continue
+
+            for name in state.transitions:
+                if name not in index:
+                    msg = "State '{}' declares a transition to unknown state '{}'"
+                    raise StateTransitionError(msg.format(state.name, name))
+
+            allowed.append(frozenset(index[name] for name in state.transitions))
+
+        self._state_names = names
+        self._state_index = index
+        self._state_slots = states
+        self._handlers = [state.handle_line for state in states]
+        self._enters = [state.enter for state in states]
+        self._exits = [state.exit for state in states]
+        self._allowed = allowed
+        skips = [_compile_skip(state.skip_unless) for state in states]
+        self._skips = [skip for skip, needles in skips]
+        self._skip_needles = [needles for skip, needles in skips]
+        self._compiled = True
+
+    @property
+    def _current_state(self):
+        return self._state_slots[self._current]
+
+    @_current_state.setter
+    def _current_state(self, state):
+        if not self._compiled:
+            self._compile_states()
+
+        self._current = self._state_index[state.name]
+        self._handle = self._handlers[self._current]
+        self._skip = self._skips[self._current]
+
     def change_state(self, name):
-        self._next_state = self._get_state(name)
-        self._current_state.exit()
-        self._previous_state = self._current_state
-        self._current_state = self._next_state
-        self._next_state = None
-        self._current_state.enter()
+        if not self._compiled:
+            self._compile_states()
+
+        current = self._current
+        try:
+            next_slot = self._state_index[name]
+        except KeyError:
+            msg = "Unknown state '{}'"
+            raise StateTransitionError(msg.format(name))
+        allowed = self._allowed[current]
+        if allowed is not None and next_slot not in allowed:
+            msg = "Illegal transition from state '{}' to state '{}'"
+            raise StateTransitionError(msg.format(self._state_names[current],
+                name))
+
+        for hook in self._transition_hooks:
+            hook(self._state_names[current], name)
+
+        self._next = next_slot
+        self._exits[current]()
+        self._previous = current
+        self._current = next_slot
+        self._handle = self._handlers[next_slot]
+        self._skip = self._skips[next_slot]
+        self._next = None
+        self._enters[next_slot]()
 
     def change_to_previous_state(self):
         self.change_state(self.previous_state)
 
     @property
     def previous_state(self):
-        return self._previous_state.name
+        if self._previous is None:
+            return None
+
+        return self._state_names[self._previous]
 
     @property
     def next_state(self):
-        try:
-            return self._next_state.name
-        except AttributeError:
+        if self._next is None:
             return None
 
+        return self._state_names[self._next]
+
     def handle_line(self, line):
         self._line_number += 1
         self._current_line = line
-        self._current_state.handle_line(line)
+        skip = self._skip
+        if skip is None or skip(line):
+            self._handle(line)
         self._previous_line = line
 
+    def add_transition_hook(self, hook):
+        """
+        Call a function whenever the parser changes state
+
+        Args:
+            hook: Callable that takes the names of the state being exited
+                and the state being entered.
+        """
+        self._transition_hooks.append(hook)
+
+    def enable_profiling(self, slowest=10):
+        """
+        Record per-state line counts, timings and transitions
+
+        Args:
+            slowest: Number of slowest lines to keep.
+
+        Returns:
+            The StateProfile that collects the measurements.
+        """
+        self._profile = StateProfile(slowest)
+        self.add_transition_hook(self._profile.record_transition)
+        # Swap in the instrumented version so parses that aren't profiled
+        # don't pay for the timing
+        self.handle_line = self._profiled_handle_line
+        return self._profile
+
+    def _profiled_handle_line(self, line):
+        state_name = self._state_names[self._current]
+        start = default_timer()
+        StateManager.handle_line(self, line)
+        self._profile.record_line(state_name, self._line_number, line,
+            default_timer() - start)
+
+    @property
+    def profile(self):
+        return self._profile
+
+    def snapshot(self):
+        """
+        Get a copy of the parser's context and position
+
+        Returns:
+            A dictionary that can be passed to ``restore()``.
+        """
+        return {
+            'context': copy.deepcopy(dict(self)),
+            'current_state': self._state_names[self._current],
+            'previous_state': self.previous_state,
+            'line_number': self._line_number,
+            'current_line': self.current_line,
+            'previous_line': self.previous_line,
+        }
+
+    def restore(self, snapshot):
+        """Restore the context and position saved by ``snapshot()``"""
+        self.clear()
+        self.update(copy.deepcopy(snapshot['context']))
+        self._current_state = self._get_state(snapshot['current_state'])
+        previous_state = snapshot['previous_state']
+        if previous_state is None:
+            self._previous = None
+        else:
+            self._previous = self._state_index[previous_state]
+        self._line_number = snapshot['line_number']
+        self._current_line = snapshot['current_line']
+        self._previous_line = snapshot['previous_line']
+        self._current_state.restore()
+
     @property
     def current_line(self):
         return self._current_line
@@ -68,14 +468,606 @@ class StateManager(dict):
     def current_state(self):
         return self._current_state
 
+def _compile_skip(skip_unless):
+    """
+    Get a predicate and the literal strings that lines must contain for the
+    predicate to be true
+    """
+    if skip_unless is None:
+        return None, None
+    elif isinstance(skip_unless, tuple):
+        return methodcaller('startswith', skip_unless), skip_unless
+    elif isinstance(skip_unless, str):
+        return methodcaller('__contains__', skip_unless), (skip_unless,)
+    elif hasattr(skip_unless, 'match'):
+        return skip_unless.match, None
+
+    raise TypeError("Unsupported skip_unless: {!r}".format(skip_unless))
+
+def _compile_byte_skip(skip_unless, encoding):
+    """
+    Get a predicate like the one from ``_compile_skip()`` that tests lines
+    before they're decoded, or None if lines have to be decoded to be tested
+    """
+    if skip_unless is None:
+        return None
+    elif isinstance(skip_unless, tuple):
+        return methodcaller('startswith',
+            tuple(s.encode(encoding) for s in skip_unless))
+    elif isinstance(skip_unless, str):
+        return methodcaller('__contains__', skip_unless.encode(encoding))
+
+    try:
+        match = re.compile(skip_unless.pattern.encode(encoding),
+            skip_unless.flags & ~re.UNICODE).match
+    except (re.error, UnicodeError):
+        return None
+
+    # Bytes patterns only match ASCII characters the way str patterns do,
+    # so lines with any other characters are always decoded
+    return lambda line: not line.isascii() or match(line)
+
+def _is_binary(infile):
+    if isinstance(infile, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+
+    return 'b' in getattr(infile, 'mode', '')
+
+def _map_file(infile):
+    """Memory-map a file object's contents, or return None if we can't"""
+    try:
+        start = infile.tell()
+        buf = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, EnvironmentError, ValueError,
+            io.UnsupportedOperation):
+        # Not a regular file, or an empty one
+        return None, 0
+
+    return buf, start
+
+def _split_pages(text):
+    """Split text at form feeds that start a line, keeping the form feeds"""
+    return re.split(r'(?<=\n)(?=\f)', text)
+
+def _parse_page(job):
+    parser_class, text, snapshot = job
+    parser = parser_class(StringIO(text))
+    parser.restore(snapshot)
+    try:
+        parser.parse()
+    except Exception:
+        # The page will be reparsed, in order, by the calling process, which
+        # will raise the exception with the parser's position intact
+        return None
+
+    return parser.results, parser.snapshot(), parser.vote_converter.failures
+
+
 class BaseParser(StateManager):
+    # Prefixes of the first line of a page that restarts parsing from a page
+    # header.  Set this to enable ``parse_pages()``.
+    page_start_prefixes = None
+
+    # States the parser can be in at the end of a page for the next page to
+    # be parsed independently.
+    page_boundary_states = ('root',)
+
+    # Context keys that must carry over unchanged from one page to the next
+    # for the next page to be parsed independently.
+    page_context_keys = ()
+
+    # Result fields whose values repeat across many rows.  States should pass
+    # these through ``self.strings.intern()`` so only one copy of each value
+    # is kept.
+    encoded_fields = ()
+
+    # Encoding of input read from a binary file
+    encoding = 'utf-8'
+
+    # Size of the blocks read from binary input that can't be memory-mapped
+    blocksize = 1 << 20
+
     def __init__(self, infile):
         super(BaseParser, self).__init__()
         self.infile = infile
+        self._binary = _is_binary(infile)
+        self._lines = None
+        self._raw_line = None
         self.results = []
+        self.strings = StringTable()
+        self.vote_converter = VoteConverter()
+        # Number of results that have been yielded by ``iter_results()`` and
+        # removed from ``self.results``
+        self._emitted = 0
+        self._checkpoint_path = None
+        self._next_checkpoint = float('inf')
+        # Set while ``resume()`` skips lines that were already handled
+        self._resuming = False
+        # Memory map of binary input, and whether each state skips ahead in
+        # it
+        self._map = None
+        self._map_skips = None
+        # Tests of whether each state acts on a line of binary input, set
+        # once a binary parse starts
+        self._byte_skips = None
+
+    @property
+    def result_count(self):
+        """Number of results emitted so far"""
+        return self._emitted + len(self.results)
+
+    @property
+    def raw_line(self):
+        """The current line, before it was stripped"""
+        raw_line = self._raw_line
+        if raw_line.__class__ is bytes:
+            # Lines read from binary input that the state skipped are only
+            # decoded if something asks for them
+            raw_line = self._raw_line = raw_line.decode(self.encoding)
+
+        return raw_line
+
+    @raw_line.setter
+    def raw_line(self, line):
+        self._raw_line = line
+
+    @property
+    def current_line(self):
+        line = self._current_line
+        if line.__class__ is bytes:
+            line = self._current_line = line.decode(self.encoding)
+
+        return line
+
+    @property
+    def previous_line(self):
+        line = self._previous_line
+        if line.__class__ is bytes:
+            line = self._previous_line = line.decode(self.encoding)
+
+        return line
+
+    def _get_lines(self):
+        if self._lines is None:
+            if self._binary:
+                self._lines = self._iter_byte_lines()
+            else:
+                self._lines = iter(self.infile)
+
+        return self._lines
+
+    def _iter_byte_lines(self):
+        """
+        Split binary input into lines without decoding them
+
+        Regular files are memory-mapped and read with the map's
+        ``readline()``, other input is read in blocks.  Lines are split on
+        newlines only.
+
+        When the current state only acts on lines containing certain
+        literals, the lines before the next occurrence of any of them are
+        skipped in one step.  For memory-mapped input this is done by
+        ``_parse_byte_line()``, after each line, so the lines can be read
+        without a generator.  Either way, it doesn't happen while
+        ``resume()`` skips the lines before a checkpoint, since they're
+        counted by the checkpoint's line number rather than by the state.
+        """
+        if not self._compiled:
+            self._compile_states()
+        self._encoding = self.encoding
+        buf, pos = _map_file(self.infile)
+        self._map = buf
+        self._compile_byte_states()
+        if buf is None:
+            return self._iter_byte_blocks()
+
+        # Only skip over complete lines
+        self._map_end = buf.rfind(b'\n') + 1
+        buf.seek(pos)
+        if (self._byte_needles[self._current] is not None and
+                not self._resuming):
+            self._skip_mapped()
+
+        return iter(buf.readline, b'')
+
+    def _compile_states(self):
+        super(BaseParser, self)._compile_states()
+        if self._byte_skips is not None:
+            # A state was registered during a binary parse
+            self._compile_byte_states()
+
+    def _compile_byte_states(self):
+        """
+        Build the tables, by state slot, used to skip lines of binary input
+        without decoding them
+        """
+        self._byte_skips = [_compile_byte_skip(state.skip_unless,
+            self._encoding) for state in self._state_slots]
+        self._byte_needles = [
+            None if needles is None else
+            tuple(needle.encode(self._encoding) for needle in needles)
+            for needles in self._skip_needles]
+        if self._map is not None:
+            self._map_skips = [needles is not None
+                for needles in self._byte_needles]
+
+    def _skip_mapped(self):
+        buf = self._map
+        buf.seek(self._skip_ahead(buf, buf.tell(), self._map_end))
+
+    def _iter_byte_blocks(self):
+        tail = b''
+        while True:
+            block = self.infile.read(self.blocksize)
+            if not block:
+                break
+
+            buf = tail + block
+            find = buf.find
+            complete_end = buf.rfind(b'\n') + 1
+            pos = 0
+            while pos < complete_end:
+                if (self._byte_needles[self._current] is not None and
+                        not self._resuming):
+                    pos = self._skip_ahead(buf, pos, complete_end)
+                    if pos >= complete_end:
+                        break
+                newline = find(b'\n', pos)
+                yield buf[pos:newline + 1]
+                pos = newline + 1
+            tail = buf[pos:]
+
+        if tail:
+            yield tail
+
+    def _skip_ahead(self, buf, pos, end):
+        """
+        Skip the lines between pos and end that can't contain any of the
+        current state's literals
+
+        Returns:
+            The position of the first line that wasn't skipped.
+        """
+        found = -1
+        for needle in self._byte_needles[self._current]:
+            i = buf.find(needle, pos, end)
+            if i != -1 and (found == -1 or i < found):
+                found = i
+
+        if found == -1:
+            start = end
+        else:
+            newline = buf.rfind(b'\n', pos, found)
+            start = pos if newline == -1 else newline + 1
+
+        if start > pos:
+            newline = buf.rfind(b'\n', pos, start - 1)
+            last_start = pos if newline == -1 else newline + 1
+            last_line = buf[last_start:start].strip()
+            self._line_number += buf[pos:start].count(b'\n')
+            self._current_line = self._previous_line = last_line
+
+        return start
+
+    def _get_line_parser(self):
+        if self._binary:
+            return self._parse_byte_line
+
+        return self.parse_line
 
     def parse(self):
-        for line in self.infile:
-            self.raw_line = line
-            clean_line = line.strip() 
-            self.handle_line(clean_line)
+        parse_line = self._get_line_parser()
+        for line in self._get_lines():
+            parse_line(line)
+            if self._line_number >= self._next_checkpoint:
+                self._write_checkpoint(self.results[self._logged:])
+                self._logged = len(self.results)
+
+        self._finish()
+
+    def iter_results(self):
+        """
+        Parse the input file, yielding results as they are emitted
+
+        Unlike ``parse()``, results are not accumulated in ``self.results``.
+        Rows appended by a state while handling a line are yielded once the
+        line has been handled, so memory use stays flat regardless of the
+        size of the input.
+        """
+        results = self.results
+        # Results restored by ``resume()`` have already been checkpointed
+        for result in results:
+            yield result
+        self._emitted += len(results)
+        del results[:]
+
+        pending = []
+        parse_line = self._get_line_parser()
+        for line in self._get_lines():
+            parse_line(line)
+            if results:
+                for result in results:
+                    yield result
+                self._emitted += len(results)
+                if self._checkpoint_path is not None:
+                    pending.extend(results)
+                del results[:]
+
+            if self._line_number >= self._next_checkpoint:
+                self._write_checkpoint(pending)
+                pending = []
+
+        self._finish()
+
+    def parse_pages(self, processes=None):
+        """
+        Parse the input file's pages in a pool of worker processes
+
+        pdftotext separates pages with form feeds.  The first page is parsed
+        in this process and the parser's context at its end is handed to
+        workers that parse the remaining pages concurrently.  Results are
+        merged back in page order.
+
+        A page's results are only used if the page starts with one of
+        ``page_start_prefixes``, the previous page ended in one of
+        ``page_boundary_states`` and the values of ``page_context_keys``
+        carried over from the previous page match the ones the worker
+        started with.  Otherwise the page is reparsed in this process,
+        starting from the previous page's context.
+
+        Args:
+            processes: Number of worker processes.  Defaults to the number of
+                CPUs.
+        """
+        text = self.infile.read()
+        if self._binary:
+            text = text.decode(self.encoding)
+        pages = _split_pages(text)
+        if self.page_start_prefixes is None or len(pages) < 2:
+            for page in pages:
+                self._parse_text(page)
+
+            self._finish()
+            return
+
+        self._parse_text(pages[0])
+        seed = self.snapshot()
+
+        jobs = []
+        line_number = seed['line_number']
+        previous_line = seed['current_line']
+        for page in pages[1:]:
+            page_seed = dict(seed, line_number=line_number,
+                current_line=previous_line, previous_line=previous_line)
+            jobs.append((type(self), page, page_seed))
+            lines = list(StringIO(page))
+            line_number += len(lines)
+            if lines:
+                previous_line = lines[-1].strip()
+
+        pool = multiprocessing.Pool(processes)
+        try:
+            outcomes = pool.map(_parse_page, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+        for (parser_class, page, page_seed), outcome in zip(jobs, outcomes):
+            if (outcome is not None and
+                    self._is_page_independent(page, self.snapshot(), seed)):
+                results, snapshot, failures = outcome
+                # Results from workers have their own copies of strings
+                self._intern_results(results)
+                self.results.extend(results)
+                self.vote_converter.failures.extend(failures)
+                self.restore(snapshot)
+            else:
+                self._parse_text(page)
+
+        self._finish()
+
+    def _parse_text(self, text):
+        for line in StringIO(text):
+            self.parse_line(line)
+
+    def _is_page_independent(self, page, previous, seed):
+        for line in StringIO(page):
+            line = line.strip()
+            if line:
+                break
+        else:
+            return False
+
+        if not line.startswith(self.page_start_prefixes):
+            return False
+
+        if (previous['current_state'] not in self.page_boundary_states or
+                seed['current_state'] not in self.page_boundary_states):
+            return False
+
+        for key in self.page_context_keys:
+            if previous['context'].get(key) != seed['context'].get(key):
+                return False
+
+        return True
+
+    def convert_votes(self, value):
+        """
+        Convert a vote count to an integer
+
+        Values that can't be converted are returned as they are and recorded,
+        with the current line number, in ``self.vote_converter.failures``.
+        """
+        return self.vote_converter.convert(value, self._line_number)
+
+    def _intern_results(self, results):
+        intern = self.strings.intern
+        for result in results:
+            for field in self.encoded_fields:
+                result[field] = intern(result[field])
+
+    def encode_results(self, fields):
+        """
+        Get the results as columns, with repeated values dictionary-encoded
+
+        Args:
+            fields: List of field names to include.
+
+        Returns:
+            A dictionary mapping each field name to a list of its values.
+            Values of fields in ``encoded_fields`` are replaced by their codes
+            in ``self.strings``.
+        """
+        columns = {}
+        for field in fields:
+            if field in self.encoded_fields:
+                encode = self.strings.encode
+                columns[field] = [encode(result[field])
+                                  for result in self.results]
+            else:
+                columns[field] = [result[field] for result in self.results]
+
+        return columns
+
+    def enable_profiling(self, slowest=10, outfile=None):
+        """
+        Record per-state line counts, timings and transitions
+
+        The measurements are dumped as JSON when the parse finishes.
+
+        Args:
+            slowest: Number of slowest lines to keep.
+            outfile: File-like object the JSON is written to.  Defaults to
+                standard error.
+        """
+        self._profile_outfile = outfile if outfile is not None else sys.stderr
+        return super(BaseParser, self).enable_profiling(slowest)
+
+    def snapshot(self):
+        snapshot = super(BaseParser, self).snapshot()
+        snapshot['result_count'] = self.result_count
+        return snapshot
+
+    def enable_checkpoints(self, path, every=1000):
+        """
+        Save the parser's context to a file every ``every`` lines
+
+        Results emitted since the previous checkpoint are appended, as JSON
+        lines, to a file named like the checkpoint with a ".results"
+        suffix.  Both files are removed when the parse finishes.
+
+        To pick up a failed parse where it left off, call ``resume()`` with
+        the same path before calling this method again.
+
+        Args:
+            path: Path of the checkpoint file.
+            every: Number of input lines between checkpoints.
+        """
+        self._checkpoint_path = path
+        self._checkpoint_every = every
+        self._next_checkpoint = self._line_number + every
+        self._logged = self.result_count
+        self._truncate_checkpoint_results(self._logged)
+
+    def resume(self, path):
+        """
+        Restore the parser from a checkpoint written by ``enable_checkpoints()``
+
+        The input lines before the checkpoint are skipped and the results
+        emitted before it are loaded into ``self.results`` rather than
+        being parsed again.
+
+        Args:
+            path: Path of the checkpoint file.
+        """
+        with open(path) as f:
+            snapshot = json.load(f)
+
+        self.restore(snapshot)
+
+        with open(path + ".results") as f:
+            rows = [json.loads(line)
+                    for line in islice(f, snapshot['result_count'])]
+        if len(rows) != snapshot['result_count']:
+            msg = "Checkpoint has {} results but only {} were saved"
+            raise ValueError(msg.format(snapshot['result_count'], len(rows)))
+
+        self.results = rows
+        self._emitted = 0
+
+        # Skip the lines that were handled before the checkpoint, one raw
+        # line at a time.  Skipping ahead would use the restored state to
+        # decide which lines to skip and add them to the restored line
+        # number.
+        self._resuming = True
+        try:
+            next(islice(self._get_lines(), snapshot['line_number'],
+                snapshot['line_number']), None)
+        finally:
+            self._resuming = False
+
+    def _write_checkpoint(self, results):
+        with open(self._checkpoint_path + ".results", 'a') as f:
+            for result in results:
+                f.write(json.dumps(dict(result)))
+                f.write("\n")
+
+        # Write the checkpoint to a temporary file and then move it into
+        # place so a crash doesn't leave a partial checkpoint
+        tmp_path = self._checkpoint_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, self._checkpoint_path)
+
+        self._next_checkpoint = self._line_number + self._checkpoint_every
+
+    def _truncate_checkpoint_results(self, count):
+        results_path = self._checkpoint_path + ".results"
+        try:
+            with open(results_path) as f:
+                lines = list(islice(f, count))
+        except IOError:
+            lines = []
+
+        with open(results_path, 'w') as f:
+            f.writelines(lines)
+
+    def _finish(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._map_skips = None
+
+        if self._profile is not None:
+            self._profile.dump(self._profile_outfile)
+
+        if self._checkpoint_path is not None:
+            # The parse completed.  There's nothing to resume.
+            for path in (self._checkpoint_path,
+                    self._checkpoint_path + ".results"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+            self._checkpoint_path = None
+            self._next_checkpoint = float('inf')
+
+    def parse_line(self, line):
+        """Handle a single raw line of input"""
+        self._raw_line = line
+        clean_line = line.strip()
+        self.handle_line(clean_line)
+
+    def _parse_byte_line(self, line):
+        skip = self._byte_skips[self._current]
+        if skip is None or skip(line.strip()):
+            raw_line = self._raw_line = line.decode(self._encoding)
+            self.handle_line(raw_line.strip())
+        else:
+            # The current state won't look at the line, so it's only decoded
+            # if something asks for it
+            self._raw_line = line
+            self._line_number += 1
+            self._current_line = self._previous_line = line.strip()
+
+        if self._map_skips is not None and self._map_skips[self._current]:
+            self._skip_mapped()
@@ -0,0 +1,92 @@
+"""
+Fixes for known bad lines in the input files
+
+Some lines of the input files are broken in ways that aren't worth handling
+in general, like a line split in two when a PDF was converted to text, or two
+columns run together.  Rather than having the parsers check every line for
+each of these, the lines are listed in ``fixups.json``, keyed by parser, and
+mapped to the name of an action and its arguments.  Each parser knows how to
+carry out its actions.  A parser that looks fixes up in more than one part of
+a line, like the whole line and a single column, has a set of fixes for
+each.
+
+A fix is found either by the exact text, which is a single dictionary
+lookup, or by a substring of the text.  The substrings are compiled into a
+single regular expression, so finding one takes one pass over the text no
+matter how many fixes there are.
+"""
+
+import json
+import os.path
+import re
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "fixups.json")
+
+
+class FixupRegistry(object):
+    """
+    Known bad lines of an input file and the fixes for them
+
+    Args:
+        exact: Dictionary mapping text to a fix.  The text must match
+            exactly.
+        substrings: Dictionary mapping substrings of text to a fix.
+
+    A fix is a dictionary with an 'action' item, naming what the parser
+    should do, and any arguments of the action.
+    """
+    def __init__(self, exact=None, substrings=None):
+        self.exact = dict(exact or {})
+        self.substrings = dict(substrings or {})
+        self._substring_re = None
+        if self.substrings:
+            # The leftmost match in the text wins.  Longer substrings come
+            # first so that, of the matches starting at the same place, the
+            # longest wins.
+            self._substring_re = re.compile('|'.join(re.escape(s)
+                for s in sorted(self.substrings, key=len, reverse=True)))
+
+    def __len__(self):
+        return len(self.exact) + len(self.substrings)
+
+    def lookup(self, text):
+        """
+        Get the fix for a piece of text
+
+        Returns:
+            The fix for the text, or None if there isn't one.
+        """
+        fix = self.exact.get(text)
+        if fix is not None or self._substring_re is None:
+            return fix
+
+        m = self._substring_re.search(text)
+        if m is None:
+            return None
+
+        return self.substrings[m.group()]
+
+
+_registries = {}
+
+def load_fixups(name, path=DEFAULT_PATH):
+    """
+    Get the fixes for a parser
+
+    Args:
+        name: Key of the parser's fixes in the data file.
+        path: Path of the data file.  Defaults to ``fixups.json`` in this
+            package.
+
+    Returns:
+        A FixupRegistry.  Registries are loaded once and shared.
+    """
+    key = (name, path)
+    if key not in _registries:
+        with open(path) as f:
+            data = json.load(f).get(name, {})
+
+        _registries[key] = FixupRegistry(data.get('exact'),
+            data.get('substrings'))
+
+    return _registries[key]
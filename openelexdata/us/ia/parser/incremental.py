@@ -0,0 +1,316 @@
+"""
+Incremental reparsing of hand-edited input files
+
+Some input files, like ``txt/20061107__ia__general__county.txt``, are
+cleaned up by hand and have to be reparsed after every edit.  An indexed
+parse records a hash of every input line and the boundaries of each
+contest, that is the lines from where the parser leaves its root state to
+where it next returns to it, along with the context at those boundaries.
+
+On the next run, the new text is diffed against the recorded hashes and
+only contests whose lines changed are reparsed.  Their rows are spliced into
+the rows of the previous output.  If a change can't be pinned to a contest,
+or reparsing a contest doesn't leave the parser where it was before, the
+whole file is parsed again.
+"""
+
+import csv
+import difflib
+import hashlib
+import json
+from io import StringIO
+
+
+def _hash_line(line):
+    return hashlib.sha1(line.encode('utf-8')).hexdigest()[:16]
+
+def _hash_lines(hashes):
+    return hashlib.sha1(''.join(hashes).encode('ascii')).hexdigest()
+
+def _normalize(snapshot):
+    # Context values come back from JSON as lists rather than tuples
+    return json.loads(json.dumps(snapshot))
+
+
+class ContestIndex(object):
+    """
+    Line hashes and contest boundaries recorded during a parse
+
+    Attributes:
+        lines: List of hashes of each input line.
+        contests: List of dictionaries with the first and last line numbers
+            of each contest, a hash of its lines, the range of result rows
+            it emitted and snapshots of the parser's context before its
+            first line and after its last line.
+        result_count: Total number of result rows.
+    """
+    def __init__(self, lines, contests, result_count):
+        self.lines = lines
+        self.contests = contests
+        self.result_count = result_count
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+
+        return cls(data['lines'], data['contests'], data['result_count'])
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                'lines': self.lines,
+                'contests': self.contests,
+                'result_count': self.result_count,
+            }, f)
+
+
+def index_parse(parser_class, text, root='root'):
+    """
+    Parse text, recording contest boundaries
+
+    Args:
+        parser_class: BaseParser subclass used to parse the text.
+        text: Input text.
+        root: Name of the state the parser is in between contests.
+
+    Returns:
+        A tuple of the list of results and a ContestIndex.
+    """
+    parser = parser_class(StringIO(text))
+    transitions = []
+    parser.add_transition_hook(lambda from_state, to_state:
+        transitions.append(to_state))
+
+    lines = list(StringIO(text))
+    hashes = [_hash_line(line) for line in lines]
+    contests = []
+    contest = None
+    before = _normalize(parser.snapshot())
+    for i, line in enumerate(lines):
+        del transitions[:]
+        parser.parse_line(line)
+        in_root = parser.current_state.name == root
+
+        if contest is None and transitions:
+            contest = {
+                'start': i + 1,
+                'row_start': before['result_count'],
+                'before': before,
+            }
+
+        if in_root:
+            before = _normalize(parser.snapshot())
+            if contest is not None and root in transitions:
+                contest['end'] = i + 1
+                contest['row_end'] = parser.result_count
+                contest['after'] = before
+                contest['hash'] = _hash_lines(hashes[contest['start'] - 1:i + 1])
+                contests.append(contest)
+                contest = None
+
+    return parser.results, ContestIndex(hashes, contests, parser.result_count)
+
+
+def _map_lines(old_hashes, new_hashes):
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes,
+        autojunk=False)
+    mapping = {}
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for k in range(i2 - i1):
+                mapping[i1 + k] = j1 + k
+
+    return mapping
+
+def _is_clean(contest, mapping):
+    start = contest['start'] - 1
+    new_start = mapping.get(start)
+    if new_start is None:
+        return False
+
+    for k in range(start, contest['end']):
+        if mapping.get(k) != new_start + k - start:
+            return False
+
+    return True
+
+def _locate_dirty(index, dirty, mapping, new_count):
+    """
+    Find the range of new lines that replaces each dirty contest
+
+    Returns:
+        List of (start, end) indexes into the new lines, or None if the lines
+        outside the dirty contests didn't survive the edit intact.
+    """
+    old_count = len(index.lines)
+    ranges = []
+    pos = 0
+    old = 0
+    bounds = [(c['start'] - 1, c['end']) for c in dirty] + [(old_count, None)]
+    for n, (start, end) in enumerate(bounds):
+        # Lines between dirty contests must map, in order, onto new lines
+        for k in range(old, start):
+            if mapping.get(k) != pos:
+                return None
+            pos += 1
+
+        if end is None:
+            break
+
+        if end < old_count:
+            if bounds[n + 1][0] == end:
+                # Adjacent dirty contests.  We can't tell where one ends and
+                # the next starts.
+                return None
+            new_end = mapping.get(end)
+            if new_end is None or new_end < pos:
+                return None
+        else:
+            new_end = new_count
+
+        ranges.append((pos, new_end))
+        pos = new_end
+        old = end
+
+    if pos != new_count:
+        return None
+
+    return ranges
+
+def _shift(snapshot, line_number, result_count, new_lines):
+    previous_line = new_lines[line_number - 1].strip() if line_number else None
+    return dict(snapshot, line_number=line_number, result_count=result_count,
+        current_line=previous_line, previous_line=previous_line)
+
+def reparse(parser_class, text, index, rows, root='root'):
+    """
+    Reparse only the contests whose lines changed
+
+    Args:
+        parser_class: BaseParser subclass used to parse the text.
+        text: New input text.
+        index: ContestIndex recorded when ``rows`` were parsed.
+        rows: List of results from the previous parse.
+        root: Name of the state the parser is in between contests.
+
+    Returns:
+        A tuple of the new list of results, a ContestIndex for the new text
+        and the number of contests that were reparsed, or None if the text
+        has to be parsed in full.
+    """
+    new_lines = list(StringIO(text))
+    new_hashes = [_hash_line(line) for line in new_lines]
+    mapping = _map_lines(index.lines, new_hashes)
+    dirty = [c for c in index.contests if not _is_clean(c, mapping)]
+    ranges = _locate_dirty(index, dirty, mapping, len(new_lines))
+    if ranges is None:
+        return None
+
+    reparsed = {}
+    for contest, (start, end) in zip(dirty, ranges):
+        if start == end:
+            return None
+
+        parser = parser_class(StringIO(''))
+        parser.restore(_shift(contest['before'], start, 0, new_lines))
+        for k in range(start, end):
+            parser.parse_line(new_lines[k])
+            if parser.current_state.name == root and k != end - 1:
+                # The contest ended earlier than it used to
+                return None
+
+        after = _normalize(parser.snapshot())
+        if (after['current_state'] != root or
+                after['context'] != contest['after']['context']):
+            # The edit changed how the following contests will be parsed
+            return None
+
+        reparsed[contest['start']] = (start, end, parser.results, after)
+
+    new_rows = []
+    contests = []
+    row = 0
+    for contest in index.contests:
+        # Rows emitted outside of contests are kept as-is
+        new_rows.extend(rows[row:contest['row_start']])
+        row = contest['row_end']
+        row_start = len(new_rows)
+
+        if contest['start'] in reparsed:
+            start, end, results, after = reparsed[contest['start']]
+            new_rows.extend(results)
+            contest_hash = _hash_lines(new_hashes[start:end])
+        else:
+            start = mapping[contest['start'] - 1]
+            end = start + contest['end'] - contest['start'] + 1
+            new_rows.extend(rows[contest['row_start']:contest['row_end']])
+            after = contest['after']
+            contest_hash = contest['hash']
+
+        contests.append({
+            'start': start + 1,
+            'end': end,
+            'row_start': row_start,
+            'row_end': len(new_rows),
+            'before': _shift(contest['before'], start, row_start, new_lines),
+            'after': _shift(after, end, len(new_rows), new_lines),
+            'hash': contest_hash,
+        })
+    new_rows.extend(rows[row:])
+
+    new_index = ContestIndex(new_hashes, contests, len(new_rows))
+    return new_rows, new_index, len(dirty)
+
+
+def parse_incremental(parser_class, fields, infile_path, outfile_path,
+        index_path=None, root='root'):
+    """
+    Parse a file to CSV, reparsing only the contests that changed since the
+    last run
+
+    Args:
+        parser_class: BaseParser subclass used to parse the text.
+        fields: Column names of the output CSV.
+        infile_path: Path of the input text file.
+        outfile_path: Path of the output CSV file.  Its rows are reused if
+            it and the index exist.
+        index_path: Path of the contest index.  Defaults to the output path
+            with ".index.json" appended.
+        root: Name of the state the parser is in between contests.
+
+    Returns:
+        The number of contests that were reparsed, or None if the whole file
+        was parsed.
+    """
+    if index_path is None:
+        index_path = outfile_path + ".index.json"
+
+    with open(infile_path) as f:
+        text = f.read()
+
+    outcome = None
+    try:
+        index = ContestIndex.load(index_path)
+        with open(outfile_path) as f:
+            rows = list(csv.DictReader(f))
+    except (IOError, ValueError):
+        index = None
+
+    if index is not None and len(rows) == index.result_count:
+        outcome = reparse(parser_class, text, index, rows, root)
+
+    if outcome is None:
+        rows, index = index_parse(parser_class, text, root)
+        reparsed = None
+    else:
+        rows, index, reparsed = outcome
+
+    with open(outfile_path, 'w') as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+    index.save(index_path)
+    return reparsed
@@ -1,7 +1,10 @@
 import re
 
 from openelexdata.us.ia import BaseParser, ParserState
-from openelexdata.us.ia.util import get_column_breaks, split_into_columns
+from openelexdata.us.ia.parser import result_type
+from openelexdata.us.ia.parser.fixups import load_fixups
+from openelexdata.us.ia.util import (ColumnBreakAccumulator, get_column_breaks,
+    header_layouts, split_into_columns)
 
 
 contest_re = re.compile(r'(?P<office>Governor|Secretary of Agriculture|'
@@ -10,29 +13,60 @@ contest_re = re.compile(r'(?P<office>Governor|Secretary of Agriculture|'
         'United States Representative|United States Senator|'
         'Governor/Lieutenant Governor|President/Vice President)'
         '( District (?P<district_num>\d{1,3})|)( - (?P<party>Democrat|Iowa Green Party|Republican)|)')
-       
+
+fields = [
+    'office',
+    'district',
+    'candidate',
+    'party',
+    'reporting_level',
+    'jurisdiction',
+    'votes',
+]
+
+Result = result_type('Result', fields)
+
 whitespace_re = re.compile(r'\s{2,}')
 number_re = re.compile('^[\d,]+$')
 
+# Tags the lines that change the parser's state.  Lines that don't match are
+# either numeric rows or other text, which is told apart by splitting the line
+# into columns.
+line_re = re.compile(r'(?P<contest>' + contest_re.pattern + ')|'
+    r'(?P<page_header>ELECTION:)|'
+    r'(?P<document_header>State of Iowa)|'
+    r'(?P<blank>$)')
+
 def _parse_contest_details(m):
     fields = ['office', 'party', 'district_num'] 
     return {k:m.group(k) for k in fields}
 
 class RootState(ParserState):
+    __slots__ = ()
     name = 'root'
+    transitions = ('result_header', 'document_header', 'page_header')
 
     def handle_line(self, line):
-        m = contest_re.match(line)
-        if m:
+        # Only the lines line_re matches matter here, so there's no need to
+        # split the others to tell rows from text
+        m = self._context.line_match(line)
+        if m is None:
+            return
+
+        kind = m.lastgroup
+        if kind == 'contest':
             self._context.update(_parse_contest_details(m))
             self._context.change_state('result_header')
-        elif line.startswith("State of Iowa"):
+        elif kind == 'document_header':
             self._context.change_state('document_header')
-        elif line.startswith("ELECTION:"):
+        elif kind == 'page_header':
             self._context.change_state('page_header')
 
 class DocumentHeaderState(ParserState):
+    __slots__ = ()
     name = 'document_header'
+    transitions = ('root',)
+    skip_unless = ("Secretary of State",)
 
     def handle_line(self, line):
         if line.startswith("Secretary of State"):
@@ -40,54 +74,81 @@ class DocumentHeaderState(ParserState):
 
 
 class PageHeader(ParserState):
+    __slots__ = ()
     name = 'page_header'
+    transitions = ('result_header',)
+    skip_unless = contest_re
 
     def enter(self):
         if "Primary" in self._context.current_line:
             self._context['primary'] = True
 
     def handle_line(self, line):
-        m = contest_re.match(line)
-        if m:
+        m = self._context.line_match(line)
+        if m is not None and m.lastgroup == 'contest':
             self._context.update(_parse_contest_details(m))
             self._context.change_state('result_header')
 
 class ResultHeader(ParserState):
+    __slots__ = ('_column_breaks',)
     name = 'result_header'
+    transitions = ('result_header', 'results')
 
     def enter(self):
         self._context['header_lines'] = []
+        self._column_breaks = ColumnBreakAccumulator()
+
+    def restore(self):
+        self._column_breaks = ColumnBreakAccumulator()
+        for header_line in self._context['header_lines']:
+            self._column_breaks.add(header_line)
+
+    def exit(self):
+        if self._context.next_state == 'results':
+            self._context['header_breaks'] = self._column_breaks.breaks
 
     def handle_line(self, line):
-        if not line:
+        kind = self._context.line_kind(line)
+        if kind == 'blank':
             return
 
-        cols = whitespace_re.split(line)
-        m = contest_re.match(line)
-        if m:
+        if kind == 'contest':
+            m = self._context.line_match(line)
             self._context.update(_parse_contest_details(m))
             self._context.change_state('result_header')
-        elif len(cols) > 1 and number_re.match(cols[1]):
+        elif kind == 'numeric_row':
             self._context.change_state('results')
         else:
             self._context['header_lines'].append(self._context.raw_line)
+            self._column_breaks.add(self._context.raw_line)
 
 
 class Results(ParserState):
+    __slots__ = ('_candidates', '_parties', '_office', '_district', '_columns')
     name = 'results'
+    transitions = ('page_header', 'root')
+
+    # Known bad rows
+    fixups = load_fixups('post2002')
 
     def enter(self):
         if self._context.previous_state == 'result_header':
-            self._candidates, self._parties = self._parse_header()
+            self._set_columns()
             #print(self._candidates)
             #print(self._parties)
             self.handle_line(self._context.current_line)
 
+    def restore(self):
+        self._set_columns()
+
     def exit(self):
         if self._context.next_state == "root":
             del self._context['header_lines']
+            self._context.pop('header_breaks', None)
 
     def handle_line(self, line):
+        # Result rows are most of the file, so they're checked directly
+        # rather than classified with line_re
         if line.startswith("ELECTION:"):
             self._context.change_state('page_header')
             return
@@ -97,40 +158,49 @@ class Results(ParserState):
             return
 
         cols = self._fix_cols(cols)
-        jurisdiction = cols[0]
+        jurisdiction = self._context.strings.intern(cols[0])
         reporting_level = 'racewide' if jurisdiction == "Totals" else 'county'
-        vote_index = 1
-        for i in range(len(self._candidates)):
-            candidate = self._candidates[i]
-            party = self._parties[i]
-            if not party and self._context['primary']:
-                party = self._parties[0]
-
-            try:
-                votes = cols[vote_index].replace(',', '')
-            except IndexError:
-                # Some result files have no values in a column.  In particular
-                # this is the case for the Secretary of State results.
-                votes = ''
-
-            vote_index += 1
-            self._context.results.append({
-                'office': self._context['office'], 
-                'district': self._context['district_num'],
-                'candidate': candidate,
-                'party': party, 
-                'reporting_level': reporting_level, 
-                'jurisdiction': jurisdiction,
-                'votes': votes, 
-            })
+        votes = cols[1:]
+        if len(votes) < len(self._columns):
+            # Some result files have no values in a column.  In particular
+            # this is the case for the Secretary of State results.
+            votes += [''] * (len(self._columns) - len(votes))
+
+        office = self._office
+        district = self._district
+        convert_votes = self._context.convert_votes
+        # Result's arguments are in the order of fields
+        self._context.results.extend([Result(office, district, candidate,
+                party, reporting_level, jurisdiction, convert_votes(vote))
+            for (candidate, party), vote in zip(self._columns, votes)])
 
         if cols[0] == "Totals":
             self._context.change_state('root')
 
+    def _set_columns(self):
+        """
+        Set up the values shared by every row of the contest
+        """
+        intern = self._context.strings.intern
+        candidates, parties = self._parse_header()
+        self._candidates = [intern(c) for c in candidates]
+        self._parties = [intern(p) for p in parties]
+        self._office = intern(self._context['office'])
+        self._district = self._context['district_num']
+
+        # A candidate and party for each vote column
+        columns = []
+        for candidate, party in zip(self._candidates, self._parties):
+            if not party and self._context['primary']:
+                party = self._parties[0]
+            columns.append((candidate, party))
+        self._columns = tuple(columns)
+
     def _fix_cols(self, cols):
-        # Fix known case where there's only one space separating the first
-        # (jurisdiction) and second columns.
-        if cols[0] == "POTTAWATTAMIE 12,090":
+        # Fix known cases, like where there's only one space separating the
+        # first (jurisdiction) and second columns.
+        fix = self.fixups.lookup(cols[0])
+        if fix is not None and fix['action'] == 'split_first_col':
             split_vals = cols[0].split(" ")
             cols[0] = split_vals[0]
             cols.insert(1, split_vals[1])
@@ -138,15 +208,49 @@ class Results(ParserState):
         return cols
 
     def _parse_header(self, header_lines=None):
+        if header_lines is None:
+            header_lines = self._context['header_lines']
+            breaks = self._context.get('header_breaks')
+        else:
+            breaks = None
+        #print(header_lines)
+
+        # Contests that span pages repeat their header on every page.  The
+        # Governor fix and the party fallback depend on the contest as well
+        # as the header lines, so they're part of the key.
+        general_gov = (self._context['office'] == "Governor" and
+            not self._context['primary'])
+        party = ('party' in self._context, self._context.get('party'))
+        return header_layouts.lookup((type(self), general_gov, party),
+            header_lines, lambda lines: self._build_header(lines, breaks,
+                general_gov, party))
+
+    def _build_header(self, header_lines, breaks, general_gov, party):
+        # HACK: Misaligned columns in first page of 2002 general Governor
+        # results.  Fix it.
+        if general_gov:
+            return self._general_gov_candidates_parties()
+
+        breaks, candidates, parties = self._parse_header_layout(header_lines,
+            breaks)
+
+        # Some result headers do not include parties, grab the party from the
+        # contest headers we parsed earlier 
+        has_party, party = party
+        if parties[0] == '' and has_party:
+            parties[0] = party
+
+        return candidates, parties
+
+    @staticmethod
+    def _parse_header_layout(header_lines, breaks=None):
         #candidate_col_vals = ["Write-In", "Votes", "Totals"]
         party_col_vals = ["Democratic", "Iowa Green", "Party", "Republican",
             "Libertarian", "Nominated by", "Petition",
             "Constitution", "Socialist", "Workers Party"]
-        if header_lines is None:
-            header_lines = self._context['header_lines']
-        #print(header_lines)
-        self._breaks = get_column_breaks(header_lines)
-        header_cols = split_into_columns(header_lines, self._breaks)
+        if breaks is None:
+            breaks = get_column_breaks(header_lines)
+        header_cols = split_into_columns(header_lines, breaks)
 
         parties = ['']*len(header_cols[0])
         candidates = ['']*len(header_cols[0])
@@ -163,18 +267,7 @@ class Results(ParserState):
                     sep = " " if candidates[i] else ""
                     candidates[i] += sep + col
 
-        # Some result headers do not include parties, grab the party from the
-        # contest headers we parsed earlier 
-        if parties[0] == '' and 'party' in self._context:
-            parties[0] = self._context['party']
-
-        # HACK: Misaligned columns in first page of 2002 general Governor
-        # results.  Fix it.
-        if (self._context['office'] == "Governor" and
-                not self._context['primary']):
-            return self._general_gov_candidates_parties()
-
-        return candidates, parties
+        return breaks, candidates, parties
 
     def _general_gov_candidates_parties(self):
         candidates = [
@@ -197,6 +290,15 @@ class Results(ParserState):
 
 
 class ResultParser(BaseParser):
+    # Every page restarts at an "ELECTION:" page header, which is handled the
+    # same way whether we were between contests or in the middle of one.
+    # The contest and result header are repeated after the page header, so
+    # only the primary flag carries over between pages.
+    page_start_prefixes = ("ELECTION:",)
+    page_boundary_states = ('root', 'results')
+    page_context_keys = ('primary',)
+    encoded_fields = ('office', 'candidate', 'party', 'jurisdiction')
+
     def __init__(self, infile):
         super(ResultParser, self).__init__(infile)
         self._register_state(RootState(self))
@@ -208,13 +310,55 @@ class ResultParser(BaseParser):
 
         self['primary'] = False
 
+        self._classified_line = None
+        self._line_match = None
+        self._line_kind = None
+        self._line_cols = None
+
+    def line_kind(self, line):
+        """
+        Get the kind of a line
+
+        The line is classified once, however many states look at it.
+
+        Returns:
+            One of 'contest', 'page_header', 'document_header', 'blank',
+            'numeric_row' or 'other'.
+        """
+        m = self.line_match(line)
+        if self._line_kind is None:
+            if m is not None:
+                self._line_kind = m.lastgroup
+            else:
+                cols = self.line_cols(line)
+                if len(cols) > 1 and number_re.match(cols[1]):
+                    self._line_kind = 'numeric_row'
+                else:
+                    self._line_kind = 'other'
 
-fields = [
-    'office',
-    'district',
-    'candidate',
-    'party',
-    'reporting_level',
-    'jurisdiction',
-    'votes',
-]
+        return self._line_kind
+
+    def line_match(self, line):
+        """Get the match of line_re for a line, or None"""
+        if line is not self._classified_line:
+            self._classified_line = line
+            self._line_match = line_re.match(line)
+            self._line_kind = None
+            self._line_cols = None
+
+        return self._line_match
+
+    def line_cols(self, line):
+        """
+        Get a line split into columns on whitespace
+
+        The list is shared by the states that look at the line, so copy it
+        before changing it.
+        """
+        if line is not self._classified_line:
+            self.line_match(line)
+
+        if self._line_cols is None:
+            self._line_cols = whitespace_re.split(line)
+
+        return self._line_cols
@@ -1,14 +1,31 @@
 import re
 
-from openelexdata.us.ia.util import split_line_into_columns
-from openelexdata.us.ia.parser import BaseParser, ParserState
+from openelexdata.us.ia.util import ColumnSplitter, get_column_splitter
+from openelexdata.us.ia.parser import BaseParser, ParserState, result_type
+from openelexdata.us.ia.parser.fixups import load_fixups
+
+fields = [
+    'office',
+    'district',
+    'candidate',
+    'party',
+    'reporting_level',
+    'jurisdiction',
+    'county',
+    'county_number',
+    'votes',
+]
+
+Result = result_type('Result', fields)
 
 whitespace_re = re.compile(r'\s{2,}')
 number_re = re.compile(r'[0-9,]+')
-clean_number_re = re.compile(r'^\d+$')
 
 class RootState(ParserState):
+    __slots__ = ()
     name = 'root'
+    transitions = ('header',)
+    skip_unless = ("GENERAL ELECTION",)
 
     def handle_line(self, line):
         if line.startswith("GENERAL ELECTION"):
@@ -16,7 +33,9 @@ class RootState(ParserState):
 
 
 class HeaderState(ParserState):
+    __slots__ = ()
     name ='header'
+    transitions = ('results',)
 
     party_cols = [
         "COUNTY",
@@ -55,6 +74,7 @@ class HeaderState(ParserState):
             self._parse_offices(line)
         elif line.startswith("COUNTY"):
             self._parse_parties(line)
+            self._plan_columns()
             self._context['breaks'] = self._detect_column_breaks(self._context.raw_line)
         else:
             # It's a result!
@@ -68,7 +88,8 @@ class HeaderState(ParserState):
         cols = whitespace_re.split(line) 
         # Ignore the first bit "GENERAL ELECTION" and the last
         # "IOWA DISTRICTS NUMBERS".  The rest are office names
-        self._context['offices'] = cols[1:-1]
+        intern = self._context.strings.intern
+        self._context['offices'] = [intern(office) for office in cols[1:-1]]
 
     def _parse_parties(self, line):
         if 'parties' in self._context:
@@ -78,10 +99,59 @@ class HeaderState(ParserState):
         cols = whitespace_re.split(line)
         # Skip the leading colums, which are county name, county number and
         # precinct name and the final one which are the distrct number headers
-        self._context['parties'] = cols[3:7]
+        intern = self._context.strings.intern
+        self._context['parties'] = [intern(party) for party in cols[3:7]]
+
+    # Index, in the trailing district number columns, of the district of
+    # each office
+    district_cols = {
+        "IOWA HOUSE": 0,
+        "IOWA SENATE": 1,
+        "US REPRESENTATIVE": 2,
+    }
+
+    def _plan_columns(self):
+        """
+        Work out the office, party and district column of each vote column
+
+        There's a column for each party under each office, so this only
+        has to be done once rather than for every vote.
+        """
+        if 'column_plan' in self._context:
+            return
+
+        self._context['column_plan'] = tuple(
+            (office, party, self.district_cols.get(office))
+            for office in self._context['offices']
+            for party in self._context['parties'])
+
+    # Matches any of the column headings.  Longer headings come first so
+    # "US REP" isn't matched as "REP".
+    party_col_re = re.compile('|'.join(re.escape(s)
+        for s in sorted(set(party_cols), key=len, reverse=True)))
 
     @classmethod
     def _detect_column_breaks(cls, line):
+        # Find all the headings in one pass.  If they aren't the ones we
+        # expect, in order, look for them one at a time.
+        matches = list(cls.party_col_re.finditer(line))
+        if [m.group() for m in matches] != cls.party_cols:
+            return cls._search_column_breaks(line)
+
+        breaks = []
+        for m in matches:
+            s = m.group()
+            if s == "COUNTY":
+                breaks.append(0)
+            elif s == "PRECINCT NAME":
+                breaks.append(breaks[-1] + 4)
+            else:
+                breaks.append(m.start())
+
+        return breaks
+
+    @classmethod
+    def _search_column_breaks(cls, line):
         breaks = []
         last_idx = 0
         break_idx = 0
@@ -102,20 +172,40 @@ class HeaderState(ParserState):
 
 
 class ResultsState(ParserState):
+    __slots__ = ('_splitter',)
     name = 'results'
+    transitions = ('header',)
+
+    # The last line in the file has column breaks that don't quite line up
+    # with the headers
+    grand_total_splitter = ColumnSplitter([0, 17, 21, 54, 66, 76, 85, 93, 103,
+        113, 122, 130, 140, 150, 157, 165, 173, 181, 189, 197, 209, 219, 228,
+        236, 245, 255])
+
+    # Known bad lines
+    fixups = load_fixups('precinct2004')
+    # Known jurisdictions with blank vote counts.  These are only matched in
+    # the jurisdiction column.
+    jurisdiction_fixups = load_fixups('precinct2004_jurisdictions')
 
     def enter(self):
+        self.restore()
         self.handle_line(self._context.current_line)
 
+    def restore(self):
+        # Generally, the columns line up with the headers
+        self._splitter = get_column_splitter(self._context['breaks'])
+
     def handle_line(self, line):
         if line.startswith("GENERAL ELECTION"):
             self._context.change_state('header')
             return
         elif line == "":
             return
-        elif ("Douglas Melville N 1/2 Leroy Twps N 1/2 Audubon" in line or
-              "Audubon Exire Greeley Hamlin Twps & Exira City" in line or
-              "Jamestown Twp., Saratoga Twp., & Howard Center" in line):
+
+        fix = self.fixups.lookup(line)
+        action = fix['action'] if fix is not None else None
+        if action == 'merge_next_line':
             # Some lines in the PDF get split into two lines when converted to
             # text.  Save the initial columns and merge them with
             # columns from the next row later.
@@ -124,8 +214,7 @@ class ResultsState(ParserState):
         elif 'previous_cols' in self._context:
             clean_line = self._context.raw_line.replace("City", "    ")
             clean_line = clean_line.replace("Twp.", "    ")
-            cols = split_line_into_columns(clean_line,
-                self._context['breaks'])
+            cols = self._splitter.split(clean_line)
             cols = self._merge(self._context['previous_cols'],
                 cols)
             del self._context['previous_cols']
@@ -133,72 +222,59 @@ class ResultsState(ParserState):
         else:
             # Split on fixed width instead of whitespace re because some
             # cols have missing values
-
-            # Generally, the columns line up with the headers
-            breaks = self._context['breaks']
-
             if line.startswith("Grand Total"):
-                # The last line in the file has column breaks that don't
-                # quite line up with the headers
-                breaks = [0, 17, 21, 54, 66, 76, 85, 93, 103, 113, 122, 130, 140, 150, 157, 165, 173, 181, 189, 197, 209, 219, 228, 236, 245, 255]
+                splitter = self.grand_total_splitter
+            else:
+                splitter = self._splitter
 
-            cols = split_line_into_columns(self._context.raw_line, breaks)
+            cols = splitter.split(self._context.raw_line)
                 
         # Fourth column (index 3) should be the start of vote results
         # and therefore a number
         if not number_re.match(cols[3]):
             if cols[0].endswith("Total"):
                 cols = self._split_totals(cols)
-            elif ("Absentee and Special Ballots" in cols[2] or
-                  "Oskaloosa Ward 2" in cols[2] or
-                  "Oskaloosa Ward 3" in cols[2]):
+            elif self._allows_blank_votes(cols[2]):
                 # Some rows just have blank values in certain columns. Onward.
                 pass
-            elif "Falls Plymouth Lime Creek Mason N Twps Pct" in line:
-                cols[2] = "Falls Plymouth Lime Creek Mason N Twps Pct"
-                cols[3] = "265"
+            elif action == 'set_cols':
+                for i, value in fix['cols'].items():
+                    cols[int(i)] = value
             else:
                 print(cols)
                 raise AssertionError("Unexpected column alignment")
 
-        county = cols[0]
-        county_num = cols[1]
-        jurisdiction = cols[2]
+        intern = self._context.strings.intern
+        county = intern(cols[0])
+        county_num = intern(cols[1])
+        jurisdiction = intern(cols[2])
         votes = cols[3:-3]
         district_numbers = cols[-3:]
 
-        for i in range(len(votes)):
-            vote = votes[i].replace(',', '')
-
+        convert_votes = self._context.convert_votes
+        for vote, (office, party, district_col) in zip(votes,
+                self._context['column_plan']):
             if vote == "" or vote == "X":
                 continue
 
-            assert clean_number_re.match(vote), "Invalid vote value: {}".format(vote)
+            vote = convert_votes(vote)
 
-            office_idx = i / len(self._context['parties'])
-            office = self._context['offices'][office_idx]
-            party = self._context['parties'][i % len(self._context['parties'])]
-
-            if office == "US REPRESENTATIVE":
-                district = district_numbers[2]
-            elif office == "IOWA SENATE":
-                district = district_numbers[1]
-            elif office == "IOWA HOUSE":
-                district = district_numbers[0]
-            else:
+            if district_col is None:
                 district = ""
-
-            result = {
-                'office': office, 
-                'district': district, 
-                'candidate': '',
-                'party': party, 
-                'reporting_level': 'precinct', 
-                'jurisdiction': jurisdiction,
-                'county': county,
-                'county_number': county_num,
-                'votes': vote, 
-            }
+            else:
+                district = district_numbers[district_col]
+
+            result = Result(
+                office=office,
+                district=district,
+                candidate='',
+                party=party,
+                reporting_level='precinct',
+                jurisdiction=jurisdiction,
+                county=county,
+                county_number=county_num,
+                votes=vote,
+            )
             self._context.results.append(result)
 
     @classmethod
@@ -212,6 +288,10 @@ class ResultsState(ParserState):
 
         return shorter[0:] + longer[len(shorter):]
 
+    def _allows_blank_votes(self, jurisdiction):
+        fix = self.jurisdiction_fixups.lookup(jurisdiction)
+        return fix is not None and fix['action'] == 'allow_blank_votes'
+
     def _split_totals(self, cols):
         """
         Split first column into county name, county number and precinct name
@@ -226,6 +306,9 @@ class ResultsState(ParserState):
 
 
 class ResultParser(BaseParser):
+    encoded_fields = ('office', 'party', 'jurisdiction', 'county',
+        'county_number')
+
     def __init__(self, infile):
         super(ResultParser, self).__init__(infile)
         self._register_state(RootState(self))
@@ -234,15 +317,3 @@ class ResultParser(BaseParser):
         self._current_state = self._get_state('root')
 
         self['primary'] = False
-
-fields = [
-    'office',
-    'district',
-    'candidate',
-    'party',
-    'reporting_level',
-    'jurisdiction',
-    'county',
-    'county_number',
-    'votes',
-]
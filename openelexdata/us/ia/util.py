@@ -1,5 +1,6 @@
 import re
 import struct
+from collections import OrderedDict
 
 NUMBER_WORDS = {
     'zero': 0,
@@ -61,8 +62,67 @@ NUMBER_WORDS = {
     'ninetieth': 90,
 }
 
+# Largest district number spelled out in the lookup table.  The Iowa House
+# has 100 districts.
+MAX_DISTRICT_WORD = 150
+
+_district_words = None
+
+def _squash_number_word(word, sep='-'):
+    """
+    Lowercase a number in words and remove the separators between words, so
+    that "SIXTY-FIFTH", "sixty fifth" and OCR'd "sixtyfifth" are the same
+    """
+    return ''.join(word.lower().replace(sep, ' ').split()).replace('-', '')
+
+def _build_district_words():
+    """
+    Map the squashed spelling of every cardinal and ordinal number up to
+    MAX_DISTRICT_WORD to its value
+    """
+    cardinals = {}
+    ordinals = {}
+    for word, value in NUMBER_WORDS.items():
+        # The ordinal words are listed after the cardinal ones
+        names = ordinals if value in cardinals else cardinals
+        names[value] = word
+
+    def spell(n, names):
+        if n in names:
+            return names[n]
+
+        tens, units = divmod(n, 10)
+        return cardinals[tens * 10] + names[units]
+
+    words = {cardinals[0]: 0}
+    for n in range(1, MAX_DISTRICT_WORD + 1):
+        for names in (cardinals, ordinals):
+            if n < 100:
+                words[spell(n, names)] = n
+            elif n == 100:
+                suffixes = [""] if names is cardinals else ["th", "reth"]
+                for suffix in suffixes:
+                    # "HUNDREDRETH" is a typo in the 2000 primary results
+                    words["onehundred" + suffix] = n
+                    words["hundred" + suffix] = n
+            else:
+                rest = spell(n - 100, names)
+                for prefix in ("onehundred", "onehundredand", "hundred"):
+                    words[prefix + rest] = n
+
+    return words
+
 def district_word_to_number(word, sep='-'):
     """Convert a district number, represented in English words, to an int"""
+    global _district_words
+    if _district_words is None:
+        _district_words = _build_district_words()
+
+    try:
+        return _district_words[_squash_number_word(word, sep)]
+    except KeyError:
+        pass
+
     bits = word.lower().split(sep)
     first = int(NUMBER_WORDS[bits[0]])
     if len(bits) == 1:
@@ -70,13 +130,105 @@ def district_word_to_number(word, sep='-'):
     else:
         return first + district_word_to_number(sep.join(bits[1:]), sep)
 
+class FixedWidthLayout(object):
+    """
+    Layout of lines with fixed-width fields
+
+    The layout is compiled once, so splitting a line doesn't have to work
+    out the field offsets again.
+
+    Args:
+        fieldwidths: List of the width of each field.
+        encoding: Encoding used to decode fields of bytes lines.
+    """
+    def __init__(self, fieldwidths, encoding='utf-8'):
+        self.fieldwidths = tuple(fieldwidths)
+        self.width = sum(self.fieldwidths)
+        self.encoding = encoding
+
+        fmt = ''.join("{}s".format(w) for w in self.fieldwidths)
+        self._struct = struct.Struct(fmt)
+        # Fields, followed by a newline that is skipped
+        self._record_struct = struct.Struct(fmt + "x")
+
+        self._slices = []
+        start = 0
+        for w in self.fieldwidths:
+            self._slices.append(slice(start, start + w))
+            start += w
+
+    def unpack_line(self, line):
+        """
+        Split a line into its fields
+
+        Args:
+            line: String or bytes.  Short lines are padded with spaces.
+
+        Returns:
+            A list of strings with the value of each field, stripped of
+            whitespace.
+        """
+        if isinstance(line, str):
+            return [line[s].strip() for s in self._slices]
+
+        if len(line) < self.width:
+            line = bytes(line).ljust(self.width, b' ')
+
+        return self._decode(self._struct.unpack_from(line))
+
+    def iter_unpack(self, buffer):
+        """
+        Split every line of a bytes buffer into its fields
+
+        If every line is exactly as wide as the layout, the whole buffer is
+        unpacked with one struct call.  Otherwise, the buffer is split on
+        newlines and each line is unpacked separately.
+
+        Args:
+            buffer: Bytes, or any object supporting the buffer protocol, with
+                lines separated by b"\\n".
+
+        Yields:
+            A list of strings for each line, like unpack_line().
+        """
+        view = memoryview(buffer).cast('B')
+        record_size = self._record_struct.size
+        count, remainder = divmod(len(view), record_size)
+        if (count and not remainder and
+                view[self.width::record_size].tobytes() == b'\n' * count):
+            for fields in self._record_struct.iter_unpack(view):
+                yield self._decode(fields)
+            return
+
+        lines = view.tobytes().split(b'\n')
+        if not lines[-1]:
+            lines.pop()
+        for line in lines:
+            yield self.unpack_line(line)
+
+    def _decode(self, fields):
+        encoding = self.encoding
+        return [field.strip().decode(encoding) for field in fields]
+
+
+_fixed_width_layouts = {}
+
 def parse_fixed_widths(fieldwidths, line):
-    expected_length = sum(fieldwidths)
-    line = line.ljust(expected_length, ' ')
-    fmts = ' '.join("{}{}".format(w, "s") for w in fieldwidths)
-    return [col.strip() for col in struct.unpack(fmts, line)]
+    key = tuple(fieldwidths)
+    try:
+        layout = _fixed_width_layouts[key]
+    except KeyError:
+        layout = _fixed_width_layouts[key] = FixedWidthLayout(key)
+
+    return layout.unpack_line(line)
+
+default_whitespace_re = re.compile(r'\s{2,}')
 
-def get_column_breaks(lines, whitespace_re=re.compile(r'\s{2,}')):
+# Below this many characters, NumPy's setup costs more than the pure Python
+# loop
+numpy_min_chars = 400
+
+def get_column_breaks(lines, whitespace_re=default_whitespace_re):
     """
     Get breakpoints for whitespace-defined columns in lines of text
 
@@ -90,53 +242,410 @@ def get_column_breaks(lines, whitespace_re=re.compile(r'\s{2,}')):
     Returns:
         A list of integers representing the start indexes of the columns
     """
-    # Smap will hold boolean values representing whether, across all the lines,
-    # there is part of a string fragment character in that particular index.
-    # For example, for the string "Foo   Bar", the smap would be
-    # [True, True, True, False, False, False, True, True, True]
-    smap = []
-    breaks = []
+    if (whitespace_re.pattern == default_whitespace_re.pattern and
+            whitespace_re.flags == default_whitespace_re.flags):
+        lines = list(lines)
+        if (sum(len(line) for line in lines) >= numpy_min_chars and
+                all(line.isascii() for line in lines) and
+                _import_numpy() is not None):
+            return _get_column_breaks_numpy(lines)
 
+    return _get_column_breaks_python(lines, whitespace_re)
+
+def _get_column_breaks_python(lines, whitespace_re):
+    accumulator = ColumnBreakAccumulator(whitespace_re)
     for line in lines:
-        # The length of smap should be that of the longest of our lines.  If
-        # we encounter a shorter line, extend smap.
-        ldiff = len(line) - len(smap)
-        if ldiff > 0:
-            # Assume spaces are part of a whitespace run
-            smap.extend([False] * ldiff)
+        accumulator.add(line)
 
-        i = 0
-        # Get all matches of whitespace runs using our regex
-        for m in whitespace_re.finditer(line): 
-            while i < m.start():
-                # Everything between the end of the last whitespace run and
-                # the start of the current whitespace run is part of a string
-                smap[i] = True
-                i += 1
+    return accumulator.breaks
+
+class ColumnBreakAccumulator(object):
+    """
+    Column breaks of lines of text, updated as each line is added
+
+    This gives the same breaks as get_column_breaks() on all the lines added
+    so far, without going back over the earlier lines.
+
+    Args:
+        whitespace_re: Compiled regex used to test that text is whitespace.
+    """
+    def __init__(self, whitespace_re=default_whitespace_re):
+        self.whitespace_re = whitespace_re
+        # Bit i of smap is set if, across all the lines, there is part of a
+        # string fragment at index i.  For example, for the string
+        # "Foo   Bar", the bits of smap, from index 0, would be 111000111.
+        # The width is the length of the longest line.
+        self._smap = 0
+        self._width = 0
+        self._break_bits = 0
+        self._breaks = []
+
+    @property
+    def breaks(self):
+        """List of the start indexes of the columns"""
+        if self._breaks is None:
+            breaks = []
+            bits = self._break_bits
+            while bits:
+                lowest = bits & -bits
+                breaks.append(lowest.bit_length() - 1)
+                bits ^= lowest
+            self._breaks = breaks
+
+        return list(self._breaks)
 
+    def add(self, line):
+        """
+        Add a line of text
+
+        Returns:
+            True if the line changed the column breaks.
+        """
+        mask = 0
+        i = 0
+        # Get all matches of whitespace runs using our regex.  Everything
+        # between the end of the last whitespace run and the start of the
+        # current whitespace run is part of a string.
+        for m in self.whitespace_re.finditer(line):
+            if m.start() > i:
+                mask |= ((1 << (m.start() - i)) - 1) << i
             i = m.end()
-        
+
         # Assume everything from the end of the last whitespace run and the end
         # of the string is part of a string fragment
-        for j in range(i, len(line)):
-            smap[j] = True
+        if len(line) > i:
+            mask |= ((1 << (len(line) - i)) - 1) << i
+
+        width = max(self._width, len(line))
+        if not mask & ~self._smap and width == self._width:
+            return False
+
+        smap = self._smap = self._smap | mask
+        self._width = width
+
+        # A column starts where there's text and there's none at the previous
+        # index.  The first index is compared with the last one.
+        previous = (smap << 1) & ((1 << width) - 1)
+        previous |= (smap >> (width - 1)) & 1
+        break_bits = smap & ~previous
+        if break_bits == self._break_bits:
+            return False
+
+        self._break_bits = break_bits
+        self._breaks = None
+        return True
+
+# NumPy takes a while to import and most calls don't reach numpy_min_chars,
+# so it's only imported the first time it's needed.  False if it isn't
+# installed.
+_numpy = None
+_ascii_whitespace = None
+
+def _import_numpy():
+    """
+    Get the numpy module, or None if it isn't installed
+    """
+    global _numpy, _ascii_whitespace
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            _numpy = False
+        else:
+            # Characters matched by \s in ASCII text
+            _ascii_whitespace = numpy.zeros(256, dtype=bool)
+            _ascii_whitespace[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+            _numpy = numpy
+
+    return _numpy or None
+
+def _get_column_breaks_numpy(lines):
+    """
+    Vectorized version of get_column_breaks() for ASCII lines split on runs
+    of two or more whitespace characters
+    """
+    if not lines:
+        return []
+
+    np = _import_numpy()
+
+    encoded = [line.encode('ascii') for line in lines]
+    lengths = np.array([len(line) for line in encoded])
+    width = int(lengths.max())
+    if not width:
+        return []
 
-    for i in range(len(smap)):
-        if smap[i] and not smap[i - 1]:
+    # Pad every line with at least one NUL so the last character of the
+    # longest line also has a non-whitespace right neighbor
+    chars = np.frombuffer(b''.join(line.ljust(width + 1, b'\0')
+        for line in encoded), dtype=np.uint8).reshape(len(encoded), width + 1)
+    whitespace = _ascii_whitespace[chars]
+
+    # A whitespace character is part of a run if either neighbor is also
+    # whitespace
+    neighbor = np.zeros_like(whitespace)
+    neighbor[:, 1:] |= whitespace[:, :-1]
+    neighbor[:, :-1] |= whitespace[:, 1:]
+
+    in_line = np.arange(width + 1) < lengths[:, np.newaxis]
+    smap = (in_line & ~(whitespace & neighbor)).any(axis=0)[:width]
+
+    # Like the pure Python version, the first column is compared with the
+    # last one
+    return np.flatnonzero(smap & ~np.roll(smap, 1)).tolist()
+
+def infer_column_layout(lines, whitespace_re=default_whitespace_re,
+        tolerance=0.05):
+    """
+    Infer the column breaks of a page of data rows
+
+    Builds a histogram of how many rows have text at each index, in one pass
+    over the rows.  Indexes where at most ``tolerance`` of the rows have text
+    are treated as the gaps between columns, so a few misaligned rows don't
+    merge neighboring columns.  The confidence is the fraction of rows that
+    don't have text in any of the gaps.
+
+    Args:
+        lines: List of strings representing a line of data in columns.
+        whitespace_re: Compiled regex used to test that text is whitespace.
+        tolerance: Fraction of rows that may have text in a gap.  With a
+            tolerance of 0, no row can have text in a gap, so the confidence
+            is always 1.
+
+    Returns:
+        A tuple of a list of integers representing the start indexes of the
+        columns and the fraction of rows whose text doesn't cross a gap.
+    """
+    # Count the rows with text at each index by adding 1 where a string
+    # fragment starts and subtracting 1 where it ends
+    deltas = []
+    row_spans = []
+    for line in lines:
+        ldiff = len(line) + 1 - len(deltas)
+        if ldiff > 0:
+            deltas.extend([0] * ldiff)
+
+        spans = []
+        i = 0
+        for m in whitespace_re.finditer(line):
+            if m.start() > i:
+                spans.append((i, m.start()))
+            i = m.end()
+        if len(line) > i:
+            spans.append((i, len(line)))
+
+        for start, end in spans:
+            deltas[start] += 1
+            deltas[end] -= 1
+        row_spans.append(spans)
+
+    if not row_spans:
+        return [], 1.0
+
+    max_count = tolerance * len(row_spans)
+    breaks = []
+    # gaps_before[i] is the number of gap indexes before index i
+    gaps_before = [0]
+    count = 0
+    in_text = False
+    for i in range(len(deltas) - 1):
+        count += deltas[i]
+        is_text = count > max_count
+        if is_text and not in_text:
             breaks.append(i)
+        in_text = is_text
+        gaps_before.append(gaps_before[-1] + (not is_text))
+
+    aligned = 0
+    for spans in row_spans:
+        if all(gaps_before[end] == gaps_before[start] for start, end in spans):
+            aligned += 1
+
+    return breaks, aligned / len(row_spans)
+
+class ColumnSplitter(object):
+    """
+    Split lines into columns at fixed breakpoints
+
+    The slices for each column are built once, so they aren't recomputed
+    for every line.
+
+    Args:
+        breaks: List of integers representing the start indexes of the
+            columns, like those returned by get_column_breaks().
+        strip: Strip whitespace from the column values.
+        remove_commas: Remove commas from the column values, for example from
+            vote counts.
+    """
+    def __init__(self, breaks, strip=True, remove_commas=False):
+        self.breaks = tuple(breaks)
+        self.strip = strip
+        self.remove_commas = remove_commas
+
+        # The character before the start of each column is dropped
+        slices = [slice(start, end - 1)
+            for start, end in zip(self.breaks, self.breaks[1:])]
+        slices.append(slice(self.breaks[-1], None))
+        self._slices = tuple(slices)
+
+        if remove_commas and strip:
+            self._clean = lambda col: col.translate(_remove_commas).strip()
+        elif remove_commas:
+            self._clean = lambda col: col.translate(_remove_commas)
+        elif strip:
+            self._clean = str.strip
+        else:
+            self._clean = None
+
+    def split(self, line):
+        """Split a line into a list of column values"""
+        clean = self._clean
+        if clean is None:
+            return [line[s] for s in self._slices]
+
+        return [clean(line[s]) for s in self._slices]
+
+    def split_lines(self, lines):
+        """Split lines into a list of column values for each line"""
+        return [self.split(line) for line in lines]
 
-    return breaks
+    def columns(self, lines):
+        """
+        Split lines into a list of values for each column
+
+        Returns:
+            A list with a list of the values in each column, in the order of
+            the lines.
+        """
+        if not isinstance(lines, (list, tuple)):
+            lines = list(lines)
+
+        clean = self._clean
+        if clean is None:
+            return [[line[s] for line in lines] for s in self._slices]
+
+        return [[clean(line[s]) for line in lines] for s in self._slices]
+
+
+_remove_commas = str.maketrans('', '', ',')
+
+_column_splitters = {}
+
+def get_column_splitter(breaks, strip=True, remove_commas=False):
+    """
+    Get a ColumnSplitter, reusing one built for the same arguments
+    """
+    key = (tuple(breaks), strip, remove_commas)
+    try:
+        return _column_splitters[key]
+    except KeyError:
+        splitter = _column_splitters[key] = ColumnSplitter(*key)
+        return splitter
 
 def split_into_columns(lines, breaks):
-    cols = []
-    for line in lines: 
-        cols.append(split_line_into_columns(line, breaks))
-    return cols
+    return get_column_splitter(breaks).split_lines(lines)
 
 def split_line_into_columns(line, breaks):
-    cols = []
-    for i in range(len(breaks) - 1):
-        cols.append(line[breaks[i]:breaks[i+1] - 1].strip())
-    cols.append(line[breaks[-1]:].strip())
-    return cols
+    return get_column_splitter(breaks).split(line)
+
+
+class VoteConverter(object):
+    """
+    Convert vote counts to integers
+
+    Commas are removed and the rest must be ASCII digits, so signs, spaces and
+    underscores that ``int()`` would accept still count as bad values.  Values
+    that can't be converted are kept as they are and recorded, rather than
+    stopping the parse, so they can all be reported at the end.  Empty values
+    are kept as empty strings without being recorded.
+
+    Attributes:
+        failures: List of tuples of the line number and value of each vote
+            count that couldn't be converted.
+    """
+    def __init__(self):
+        self.failures = []
+
+    def convert(self, value, line_number=None):
+        digits = value.translate(_remove_commas)
+        if digits.isdigit() and digits.isascii():
+            return int(digits)
+
+        if value:
+            self.failures.append((line_number, value))
+        return value
+
+    def report(self, outfile, name=None):
+        """
+        Write a line for each vote count that couldn't be converted
+        """
+        prefix = "{}: ".format(name) if name else ""
+        for line_number, value in self.failures:
+            outfile.write("{}Invalid vote value {!r} at line {}\n".format(
+                prefix, value, line_number))
+
+
+class HeaderLayoutCache(object):
+    """
+    Least recently used cache of parsed result headers
+
+    Contests that span several pages repeat the same header on every page.
+    Parsing the header lines gives the same column layout each time, so it
+    only needs to be done once.
+
+    Args:
+        maxsize: Maximum number of parsed headers to keep.
+
+    Attributes:
+        hits: Number of lookups answered from the cache.
+        misses: Number of lookups that parsed the header lines.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._layouts = OrderedDict()
+
+    def __len__(self):
+        return len(self._layouts)
+
+    def lookup(self, namespace, header_lines, parse):
+        """
+        Get the parsed layout of header lines
+
+        Args:
+            namespace: Hashable value, such as the parser state's class,
+                that separates headers parsed in different ways.
+            header_lines: List of header lines.  The lines are compared
+                verbatim, because whitespace affects the column breaks.
+            parse: Function that takes the header lines and returns a
+                sequence of sequences, such as the column breaks, candidates
+                and parties.  It's only called on a cache miss.
+
+        Returns:
+            A list with a new list of each of the values returned by
+            ``parse``, so callers are free to modify them.
+        """
+        key = (namespace, tuple(header_lines))
+        try:
+            layout = self._layouts[key]
+        except KeyError:
+            self.misses += 1
+            layout = tuple(tuple(value) for value in parse(header_lines))
+            self._layouts[key] = layout
+            if len(self._layouts) > self.maxsize:
+                self._layouts.popitem(last=False)
+        else:
+            self.hits += 1
+            self._layouts.move_to_end(key)
+
+        return [list(value) for value in layout]
+
+    def clear(self):
+        self._layouts.clear()
+        self.hits = 0
+        self.misses = 0
+
 
+# Shared by the parsers' result header states
+header_layouts = HeaderLayoutCache()
@@ -2,9 +2,19 @@
 Test parsing of 2004 general election precinct-level file
 """
 
+from io import StringIO
 from unittest import TestCase
 
-from openelexdata.us.ia.parser.precinct2004 import HeaderState
+from openelexdata.us.ia.parser.precinct2004 import HeaderState, ResultParser
+
+SAMPLE = (
+    "GENERAL ELECTION      PRESIDENT      US SENATE      US REPRESENTATIVE      IOWA SENATE      IOWA HOUSE      IOWA DISTRICTS NUMBERS\n"
+    "     COUNTY       CO #               PRECINCT NAME          DEM     REP     OTH   SC   DEM    REP      OTH   SC   DEM         REP    OTH SC     DEM     REP    OTH   SC   DEM     REP     OTH   SC   IA HOUSE IA SENATE US REP\n"
+    "\n"
+    "Adair             01  Adair Summit Casey                    196     304     2     2    73     422      3     0    160         335    4   0      X       X      X     X    166     329     2     0    58       29        5\n"
+    "\n"
+    "Grand Total                                           1,486,956   1,504,113 23,963   2,200   826,297   2,073,089 56,130   1,615   1,253,966 1,642,687 19,892 1,841   613,506 729,327 1,536   2,850   1,302,805   1,268,044 17,894   7,237\n"
+)
 
 class HeaderStateTestCase(TestCase):
     def test_detect_column_breaks(self):
@@ -12,11 +22,80 @@ class HeaderStateTestCase(TestCase):
             "     COUNTY       CO #               PRECINCT NAME          DEM     REP     OTH   SC   DEM    REP      OTH   SC   DEM         REP    OTH SC     DEM     REP    OTH   SC   DEM     REP     OTH   SC   IA HOUSE IA SENATE US REP",
         ]
 
+        # The precinct name starts after the two digit county number
         expected_breaks = [
-            [0, 18, 37, 60, 68, 76, 82, 87, 94, 103, 109, 114, 126, 133, 137,
+            [0, 18, 22, 60, 68, 76, 82, 87, 94, 103, 109, 114, 126, 133, 137,
             144, 152, 159, 165, 170, 178, 186, 192, 197, 206, 216],
         ]
 
         for i in range(len(lines)):
             breaks = HeaderState._detect_column_breaks(lines[i])
             self.assertEqual(breaks, expected_breaks[i])
+
+    def test_detect_column_breaks_search(self):
+        line = "     COUNTY       CO #               PRECINCT NAME          DEM     REP     OTH   SC   DEM    REP      OTH   SC   DEM         REP    OTH SC     DEM     REP    OTH   SC   DEM     REP     OTH   SC   IA HOUSE IA SENATE US REP"
+        # Finding the headings in one pass gives the same breaks as searching
+        # for them one at a time
+        self.assertEqual(HeaderState._detect_column_breaks(line),
+            HeaderState._search_column_breaks(line))
+        # Headings missing from the line
+        self.assertRaises(ValueError, HeaderState._detect_column_breaks,
+            line[:100])
+
+
+class ResultParserTestCase(TestCase):
+    def test_parse(self):
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        # The IOWA SENATE race isn't on the ballot in this precinct
+        self.assertEqual(len(parser.results), 16 + 20)
+        self.assertEqual(parser.results[0]['office'], "PRESIDENT")
+        self.assertEqual(parser.results[0]['district'], "")
+        self.assertEqual(parser.results[0]['votes'], 196)
+        self.assertEqual([(r['office'], r['district'], r['party'], r['votes'])
+                for r in parser.results[8:16]], [
+            ("US REPRESENTATIVE", "5", "DEM", 160),
+            ("US REPRESENTATIVE", "5", "REP", 335),
+            ("US REPRESENTATIVE", "5", "OTH", 4),
+            ("US REPRESENTATIVE", "5", "SC", 0),
+            ("IOWA HOUSE", "58", "DEM", 166),
+            ("IOWA HOUSE", "58", "REP", 329),
+            ("IOWA HOUSE", "58", "OTH", 2),
+            ("IOWA HOUSE", "58", "SC", 0),
+        ])
+
+    def test_parse_blank_votes(self):
+        row = SAMPLE.splitlines()[3]
+        blank_row = row.replace("196", "   ")
+        sample = SAMPLE.replace(row, blank_row.replace("Adair Summit Casey",
+            "Oskaloosa Ward 2  "))
+        parser = ResultParser(StringIO(sample))
+        parser.parse()
+        # Known jurisdictions can have blank vote counts
+        self.assertEqual(len(parser.results), 15 + 20)
+        self.assertEqual(parser.results[0]['jurisdiction'], "Oskaloosa Ward 2")
+        self.assertEqual(parser.results[0]['votes'], 304)
+
+        # Other jurisdictions can't
+        parser = ResultParser(StringIO(SAMPLE.replace(row, blank_row)))
+        self.assertRaises(AssertionError, parser.parse)
+
+    def test_parse_grand_total(self):
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        # The grand total line doesn't line up with the headers
+        grand_total = parser.results[16:]
+        self.assertEqual(len(grand_total), 20)
+        self.assertEqual(dict(grand_total[0]), {
+            'office': "PRESIDENT",
+            'district': "",
+            'candidate': "",
+            'party': "DEM",
+            'reporting_level': "precinct",
+            'jurisdiction': "",
+            'county': "Grand Total",
+            'county_number': "",
+            'votes': 1486956,
+        })
+        self.assertEqual(grand_total[-1]['office'], "IOWA HOUSE")
+        self.assertEqual(grand_total[-1]['votes'], 7237)
@@ -0,0 +1,215 @@
+import csv
+import json
+import os.path
+import pickle
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from openelexdata.us.ia.parser import (BaseParser, ParserState,
+    StateTransitionError, post2002, precinct2004, result_type)
+
+Record = result_type('Record', ['office', 'candidate', 'votes'])
+
+
+class RootState(ParserState):
+    name = 'root'
+    transitions = ('contest',)
+
+    def handle_line(self, line):
+        if line.startswith("Contest"):
+            self._context.change_state('contest')
+        elif line == "Done":
+            self._context.change_state('root')
+
+
+class ContestState(ParserState):
+    name = 'contest'
+    transitions = ('root',)
+
+    def handle_line(self, line):
+        if line == "":
+            self._context.change_state('root')
+        else:
+            self._context.results.append({'line': line})
+
+
+class ResultParser(BaseParser):
+    def __init__(self, infile):
+        super(ResultParser, self).__init__(infile)
+        self._register_state(RootState(self))
+        self._register_state(ContestState(self))
+        self._current_state = self._get_state('root')
+
+
+class SkippingRootState(RootState):
+    skip_unless = ("Contest",)
+
+
+class SkippingParser(BaseParser):
+    def __init__(self, infile):
+        super(SkippingParser, self).__init__(infile)
+        self._register_state(SkippingRootState(self))
+        self._register_state(ContestState(self))
+        self._current_state = self._get_state('root')
+
+
+class LateState(ParserState):
+    __slots__ = ()
+
+    name = 'late'
+    skip_unless = ("Late",)
+
+    def handle_line(self, line):
+        self._context.results.append({'late': line})
+
+
+class LateRegisteringRootState(RootState):
+    __slots__ = ()
+
+    transitions = None
+
+    def handle_line(self, line):
+        if line == "Register":
+            self._context._register_state(LateState(self._context))
+            self._context.change_state('late')
+
+
+class LateRegisteringParser(BaseParser):
+    def __init__(self, infile):
+        super(LateRegisteringParser, self).__init__(infile)
+        self._register_state(LateRegisteringRootState(self))
+        self._current_state = self._get_state('root')
+
+
+class StateManagerTestCase(TestCase):
+    def test_change_state(self):
+        parser = ResultParser(StringIO("Contest 1\nfoo\nbar\n\n"))
+        parser.parse()
+        self.assertEqual(parser.results, [{'line': "foo"}, {'line': "bar"}])
+        self.assertEqual(parser.current_state.name, 'root')
+        self.assertEqual(parser.previous_state, 'contest')
+        self.assertEqual(parser.line_number, 4)
+
+    def test_illegal_transition(self):
+        parser = ResultParser(StringIO("Done\n"))
+        self.assertRaises(StateTransitionError, parser.parse)
+
+    def test_unknown_transition(self):
+        class BadState(ParserState):
+            name = 'bad'
+            transitions = ('missing',)
+
+        parser = ResultParser(StringIO(""))
+        parser._register_state(BadState(parser))
+        self.assertRaises(StateTransitionError, parser._compile_states)
+
+    def test_change_to_unknown_state(self):
+        parser = LateRegisteringParser(StringIO(""))
+        self.assertRaises(StateTransitionError, parser.change_state, 'late')
+
+    def test_register_state_while_parsing(self):
+        text = "junk\nRegister\nfoo\nLate 1\nbar\nLate 2\n"
+        expected = [{'late': "Late 1"}, {'late': "Late 2"}]
+        parser = LateRegisteringParser(StringIO(text))
+        parser.parse()
+        self.assertEqual(parser.results, expected)
+
+        binary = LateRegisteringParser(BytesIO(text.encode('utf-8')))
+        binary.parse()
+        self.assertEqual(binary.results, expected)
+
+        # Memory-mapped
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "late.txt")
+        with open(path, 'w') as f:
+            f.write(text)
+        with open(path, 'rb') as f:
+            mapped = LateRegisteringParser(f)
+            mapped.parse()
+        self.assertEqual(mapped.results, expected)
+        self.assertEqual(mapped.line_number, 6)
+
+    def test_state_slots(self):
+        # The parsers' states don't need a __dict__
+        for module in (post2002, precinct2004):
+            parser = module.ResultParser(StringIO(""))
+            for state in parser._states.values():
+                self.assertFalse(hasattr(state, '__dict__'), state.name)
+
+
+    def test_skip_unless(self):
+        text = "junk\nmore junk\nContest 1\nfoo\n\nDone\nContest 2\nbar\n"
+        parser = SkippingParser(StringIO(text))
+        # "Done" would be an illegal transition if it reached the handler
+        parser.parse()
+        self.assertEqual(parser.results, [{'line': "foo"}, {'line': "bar"}])
+
+        for blocksize in (8, 1 << 20):
+            binary = SkippingParser(BytesIO(text.encode('utf-8')))
+            binary.blocksize = blocksize
+            binary.parse()
+            self.assertEqual(binary.results, parser.results)
+            self.assertEqual(binary.line_number, 8)
+
+
+class ProfilingTestCase(TestCase):
+    def test_enable_profiling(self):
+        outfile = StringIO()
+        parser = ResultParser(StringIO("Contest 1\nfoo\nbar\n\nContest 2\nbaz\n"))
+        parser.enable_profiling(slowest=2, outfile=outfile)
+        parser.parse()
+
+        profile = json.loads(outfile.getvalue())
+        states = profile['states']
+        self.assertEqual(states['root']['lines'], 2)
+        self.assertEqual(states['contest']['lines'], 4)
+        self.assertEqual(states['contest']['entered'], 2)
+        self.assertEqual(states['root']['entered'], 1)
+        self.assertEqual(states['root']['transitions'], {'contest': 2})
+        self.assertEqual(states['contest']['transitions'], {'root': 1})
+        self.assertEqual(len(profile['slowest_lines']), 2)
+        self.assertEqual(sorted(profile['slowest_lines'][0]),
+            ['line', 'line_number', 'seconds', 'state'])
+        self.assertEqual(len(parser.results), 3)
+
+
+class ResultTypeTestCase(TestCase):
+    def test_mapping(self):
+        result = Record("Governor", votes="12")
+        self.assertEqual(result['office'], "Governor")
+        self.assertEqual(result.votes, "12")
+        self.assertEqual(result, {
+            'office': "Governor",
+            'candidate': None,
+            'votes': "12",
+        })
+        self.assertEqual(list(result), ['office', 'candidate', 'votes'])
+        self.assertRaises(KeyError, lambda: result['keys'])
+        self.assertFalse(hasattr(result, '__dict__'))
+
+        result['votes'] = "13"
+        self.assertEqual(result.votes, "13")
+        # Only existing fields can be set
+        self.assertRaises(KeyError, result.__setitem__, 'party', "DEM")
+        self.assertEqual(pickle.loads(pickle.dumps(result)), result)
+
+    def test_dict_writer(self):
+        outfile = StringIO()
+        writer = csv.DictWriter(outfile, Record.fields)
+        writer.writerow(Record("Governor", "Tom Vilsack", "100"))
+        self.assertEqual(outfile.getvalue(), "Governor,Tom Vilsack,100\r\n")
+
+    def test_values(self):
+        result = Record("Governor", votes=100)
+        self.assertEqual(result.values(), ("Governor", None, 100))
+        self.assertEqual(result.get('votes'), 100)
+        self.assertEqual(result.get('party', ""), "")
+        self.assertEqual(result.get('values'), None)
+        self.assertEqual(result_type('Single', ['votes'])(3).values(), (3,))
+
+        outfile = StringIO()
+        csv.writer(outfile).writerow(result.values())
+        self.assertEqual(outfile.getvalue(), "Governor,,100\r\n")
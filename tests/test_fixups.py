@@ -0,0 +1,47 @@
+"""
+Test the registry of fixes for known bad lines
+"""
+
+from unittest import TestCase
+
+from openelexdata.us.ia.parser.fixups import FixupRegistry, load_fixups
+
+class FixupRegistryTestCase(TestCase):
+    def test_lookup(self):
+        registry = FixupRegistry(
+            exact={"POTTAWATTAMIE 12,090": {'action': 'split'}},
+            substrings={
+                "Oskaloosa Ward 2": {'action': 'allow'},
+                "Oskaloosa Ward 2/3": {'action': 'merge'},
+            })
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(registry.lookup("POTTAWATTAMIE 12,090"),
+            {'action': 'split'})
+        self.assertEqual(registry.lookup("POTTAWATTAMIE 12,090 1"), None)
+        self.assertEqual(registry.lookup("Mahaska  62  Oskaloosa Ward 2  10"),
+            {'action': 'allow'})
+        # Of the matches starting at the same place, the longest wins
+        self.assertEqual(registry.lookup("Mahaska  62  Oskaloosa Ward 2/3"),
+            {'action': 'merge'})
+        # Otherwise the leftmost match wins, even if it's shorter
+        self.assertEqual(
+            registry.lookup("Oskaloosa Ward 2 and Oskaloosa Ward 2/3"),
+            {'action': 'allow'})
+        self.assertEqual(registry.lookup("Mahaska  62  Oskaloosa Ward 1"),
+            None)
+        self.assertEqual(FixupRegistry().lookup("anything"), None)
+
+    def test_load_fixups(self):
+        registry = load_fixups('2008_primary')
+        self.assertIs(load_fixups('2008_primary'), registry)
+        self.assertEqual(registry.lookup("CHRISTOPHE R REED")['value'],
+            "CHRISTOPHER REED")
+        self.assertEqual(len(load_fixups('no such parser')), 0)
+
+    def test_precinct2004_jurisdictions(self):
+        # Rows allowed to have blank votes are only matched by jurisdiction
+        registry = load_fixups('precinct2004_jurisdictions')
+        self.assertEqual(registry.lookup("Oskaloosa Ward 2/3")['action'],
+            'allow_blank_votes')
+        self.assertEqual(load_fixups('precinct2004').lookup(
+            "Mahaska  62  Oskaloosa Ward 2/3"), None)
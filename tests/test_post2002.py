@@ -0,0 +1,275 @@
+"""
+Test parsing of post-2002 county-level canvass summaries
+"""
+
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from openelexdata.us.ia.parser.incremental import index_parse, reparse
+from openelexdata.us.ia.parser.post2002 import ResultParser
+from openelexdata.us.ia.util import header_layouts
+
+SAMPLE = (
+    "State of Iowa\n"
+    "Canvass Summary\n"
+    "Secretary of State\n"
+    "\n"
+    "ELECTION: 2002 General Election\n"
+    "United States Senator\n"
+    "                 Tom             Greg\n"
+    "                 Harkin          Ganske        Write-In\n"
+    "                 Democratic      Republican    Votes          Totals\n"
+    "\n"
+    "ADAIR            1,753           1,450         3              3,206\n"
+    "ADAMS            1,000           900           1              1,901\n"
+    "\f"
+    "ELECTION: 2002 General Election\n"
+    "United States Senator\n"
+    "                 Tom             Greg\n"
+    "                 Harkin          Ganske        Write-In\n"
+    "                 Democratic      Republican    Votes          Totals\n"
+    "\n"
+    "ALLAMAKEE        2,000           1,900         2              3,902\n"
+    "Totals           4,753           4,250         6              9,009\n"
+)
+
+
+class ResultParserTestCase(TestCase):
+    def test_parse(self):
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        self.assertEqual(len(parser.results), 16)
+        self.assertEqual(parser.results[0], {
+            'office': "United States Senator",
+            'district': None,
+            'candidate': "Tom Harkin",
+            'party': "Democratic",
+            'reporting_level': "county",
+            'jurisdiction': "ADAIR",
+            'votes': 1753,
+        })
+        self.assertEqual(parser.results[-1]['reporting_level'], "racewide")
+        self.assertEqual(parser.results[-1]['votes'], 9009)
+
+    def test_invalid_votes(self):
+        parser = ResultParser(StringIO(SAMPLE.replace("1,450", "1,45O")))
+        parser.parse()
+        self.assertEqual(parser.results[1]['votes'], "1,45O")
+        self.assertEqual(parser.vote_converter.failures, [(11, "1,45O")])
+
+    def test_header_layout_cache(self):
+        header_layouts.clear()
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        # The header on the second page is the same as the first, so it's
+        # only parsed once
+        self.assertEqual((header_layouts.hits, header_layouts.misses), (1, 1))
+
+        # Another parser reuses the layout
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        self.assertEqual((header_layouts.hits, header_layouts.misses), (3, 1))
+
+    def test_line_kind(self):
+        parser = ResultParser(StringIO(""))
+        kinds = [parser.line_kind(line.strip())
+            for line in StringIO(SAMPLE).readlines()[:11]]
+        self.assertEqual(kinds, ['document_header', 'other', 'contest',
+            'blank', 'page_header', 'contest', 'other', 'other', 'other',
+            'blank', 'numeric_row'])
+        line = "ADAIR            1,753           1,450         3"
+        self.assertIs(parser.line_cols(line), parser.line_cols(line))
+
+    def test_iter_results(self):
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        expected = parser.results
+
+        parser = ResultParser(StringIO(SAMPLE))
+        results = list(parser.iter_results())
+        self.assertEqual(results, expected)
+        # Streamed results aren't accumulated on the parser
+        self.assertEqual(parser.results, [])
+
+    def test_parse_pages(self):
+        text = SAMPLE * 3
+        parser = ResultParser(StringIO(text))
+        parser.parse()
+        expected = parser.results
+
+        parser = ResultParser(StringIO(text))
+        parser.parse_pages(processes=2)
+        self.assertEqual(parser.results, expected)
+        self.assertEqual(parser.line_number, text.count("\n"))
+        self.assertEqual(parser.current_state.name, 'root')
+
+    def test_snapshot_restore(self):
+        lines = StringIO(SAMPLE).readlines()
+        parser = ResultParser(StringIO(SAMPLE))
+        for line in lines[:12]:
+            parser.parse_line(line)
+        snapshot = parser.snapshot()
+        self.assertEqual(snapshot['current_state'], 'results')
+        self.assertEqual(snapshot['line_number'], 12)
+
+        restored = ResultParser(StringIO(SAMPLE))
+        restored.restore(snapshot)
+        for line in lines[12:]:
+            parser.parse_line(line)
+            restored.parse_line(line)
+        self.assertEqual(restored.results, parser.results[8:])
+
+    def test_checkpoint_resume(self):
+        text = SAMPLE * 2
+        parser = ResultParser(StringIO(text))
+        parser.parse()
+        expected = parser.results
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "checkpoint.json")
+
+        # Stop partway through, as if the parser had crashed
+        parser = ResultParser(StringIO(text))
+        parser.enable_checkpoints(path, every=5)
+        results = parser.iter_results()
+        for i in range(20):
+            next(results)
+        self.assertTrue(os.path.exists(path))
+
+        parser = ResultParser(StringIO(text))
+        parser.resume(path)
+        self.assertEqual(parser.line_number % 5, 0)
+        parser.enable_checkpoints(path, every=5)
+        self.assertEqual(list(parser.iter_results()), expected)
+        self.assertFalse(os.path.exists(path))
+
+    def test_checkpoint_resume_binary(self):
+        # Junk between the documents is skipped while looking for the
+        # document header
+        text = SAMPLE + "junk\n" * 10 + SAMPLE
+        parser = ResultParser(StringIO(text))
+        parser.parse()
+        expected = parser.results
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "checkpoint.json")
+        input_path = os.path.join(tmpdir, "sample.txt")
+        with open(input_path, 'w') as f:
+            f.write(text)
+
+        lines = StringIO(text).readlines()
+        states = set()
+        for n in range(len(lines)):
+            parser = ResultParser(StringIO(text))
+            parser.enable_checkpoints(path, every=1)
+            for line in lines[:n]:
+                parser.parse_line(line)
+            parser._write_checkpoint(parser.results)
+            states.add(parser.current_state.name)
+
+            # Read in blocks
+            parser = ResultParser(BytesIO(text.encode('utf-8')))
+            parser.resume(path)
+            parser.parse()
+            self.assertEqual(parser.results, expected)
+            self.assertEqual(parser.line_number, len(lines))
+
+            # Memory-mapped
+            with open(input_path, 'rb') as f:
+                parser = ResultParser(f)
+                parser.resume(path)
+                parser.parse()
+            self.assertEqual(parser.results, expected)
+            self.assertEqual(parser.line_number, len(lines))
+
+        self.assertIn('document_header', states)
+
+    def test_reparse(self):
+        text = SAMPLE + SAMPLE.replace("United States Senator",
+            "Secretary of State")
+        rows, index = index_parse(ResultParser, text)
+        self.assertEqual(len(index.contests), 4)
+
+        # Edit a vote count in the second contest
+        i = text.rindex("ALLAMAKEE        2,000")
+        new_text = text[:i] + "ALLAMAKEE        2,500" + text[i + 21:]
+        new_rows, new_index, reparsed = reparse(ResultParser, new_text,
+            index, rows)
+        self.assertEqual(reparsed, 1)
+
+        parser = ResultParser(StringIO(new_text))
+        parser.parse()
+        self.assertEqual(new_rows, parser.results)
+        self.assertEqual(new_index.contests, index_parse(ResultParser,
+            new_text)[1].contests)
+
+        # Adding a line between contests requires a full parse
+        new_text = text.replace("State of Iowa", "\nState of Iowa")
+        self.assertEqual(reparse(ResultParser, new_text, index, rows), None)
+
+    def test_encode_results(self):
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        # Values repeated across pages are the same object
+        self.assertIs(parser.results[0]['candidate'],
+            parser.results[8]['candidate'])
+        self.assertIs(parser.results[0]['office'],
+            parser.results[8]['office'])
+
+        columns = parser.encode_results(['jurisdiction', 'votes'])
+        self.assertEqual(columns['votes'][:2], [1753, 1450])
+        codes = columns['jurisdiction']
+        self.assertEqual(len(set(codes)), 4)
+        self.assertEqual([parser.strings.decode(code) for code in codes],
+            [result['jurisdiction'] for result in parser.results])
+
+    def test_binary_input(self):
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        expected = parser.results
+
+        # Read in blocks
+        parser = ResultParser(BytesIO(SAMPLE.encode('utf-8')))
+        parser.blocksize = 50
+        parser.parse()
+        self.assertEqual(parser.results, expected)
+        self.assertEqual(parser.line_number, SAMPLE.count("\n"))
+
+        # Memory-mapped
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "sample.txt")
+        with open(path, 'w') as f:
+            f.write(SAMPLE)
+        with open(path, 'rb') as f:
+            parser = ResultParser(f)
+            self.assertEqual(list(parser.iter_results()), expected)
+
+    def test_binary_input_skipped_lines(self):
+        # Lines the document header state skips aren't decoded, so they
+        # don't have to be valid text.  This one contains the text the
+        # state looks for, but doesn't start with it.
+        text = SAMPLE.encode('utf-8').replace(b"Canvass Summary\n",
+            b"Canvass Summary\nR\xe9sum\xe9 of the Secretary of State\n")
+        parser = ResultParser(StringIO(SAMPLE))
+        parser.parse()
+        expected = parser.results
+
+        parser = ResultParser(BytesIO(text))
+        parser.parse()
+        self.assertEqual(parser.results, expected)
+        self.assertEqual(parser.line_number, SAMPLE.count("\n") + 1)
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "sample.txt")
+        with open(path, 'wb') as f:
+            f.write(text)
+        with open(path, 'rb') as f:
+            parser = ResultParser(f)
+            self.assertEqual(list(parser.iter_results()), expected)
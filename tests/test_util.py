@@ -1,7 +1,37 @@
-from unittest import TestCase
+from io import StringIO
+from unittest import TestCase, skipUnless
 
+from openelexdata.us.ia import util
 from openelexdata.us.ia.util import (district_word_to_number, parse_fixed_widths,
-    get_column_breaks)
+    get_column_breaks, ColumnBreakAccumulator, FixedWidthLayout,
+    ColumnSplitter, split_line_into_columns, HeaderLayoutCache,
+    infer_column_layout, VoteConverter)
+
+COLUMN_BREAK_CASES = [
+    ([
+        "                Democratic       Republican            Scattering        Totals ",
+        "                                Dwayne Arlan ",
+    ], [16, 32, 55, 73]),
+    ([
+        "                Democratic       Republican            Scattering        Totals",
+        "                 Wesley            Greg",
+        "                 Whitead         Hoversten",
+    ], [16, 33, 55, 73]),
+    ([
+        "                Doug Gross     Steve Sukup   Bob Vander ",
+        "                                               Plaats     Write-In ",
+        "                 Republican    Republican                  Votes         Totals",
+        "                                              Republican",
+    ], [16, 31, 45, 58, 73]),
+    ([
+        "       County        Michael A. Mauro   Matt Schultz           Jake Porter                                            Write-in                           Over Votes     Under         Total"
+    ], [7, 21, 40, 63, 118, 153, 168, 182]),
+    ([
+        "                                                                                 Total",
+        "            Jim Hahn     Shawn         Write-In       Under Votes   Over Votes",
+        "                       Hamerlinck",
+    ], [12, 23, 39, 54, 68, 81]),
+]
 
 class TestUtil(TestCase):
     def test_district_word_to_number(self):
@@ -9,6 +39,13 @@ class TestUtil(TestCase):
         self.assertEqual(district_word_to_number("NINETIETH"), 90)
         self.assertEqual(district_word_to_number("fifty fifth", " "), 55)
         self.assertEqual(district_word_to_number("eighth"), 8)
+        self.assertEqual(district_word_to_number("TWENTY"), 20)
+        self.assertEqual(district_word_to_number("one hundred", " "), 100)
+        self.assertEqual(district_word_to_number("ONE HUNDREDRETH", " "), 100)
+        self.assertEqual(district_word_to_number("One Hundred Twenty-Third"),
+            123)
+        self.assertEqual(district_word_to_number("onehundredfiftieth"), 150)
+        self.assertRaises(KeyError, district_word_to_number, "umpteenth")
 
     def test_parse_fixed_width(self):
         line = "   County     Democratic Republican Party of Iowa   Party   Reform Party   Workers         Constitution          USA           by Petition    Scattering   Totals"
@@ -32,40 +69,136 @@ class TestUtil(TestCase):
         self.assertEqual(bits, expected)
 
     def test_get_column_breaks(self):
-        lines = [
-            "                Democratic       Republican            Scattering        Totals ",
-            "                                Dwayne Arlan ",
-        ]
-        breaks = get_column_breaks(lines)
-        self.assertEqual(breaks, [16, 32, 55, 73])
+        for lines, expected in COLUMN_BREAK_CASES:
+            breaks = get_column_breaks(lines)
+            self.assertEqual(breaks, expected)
 
-        lines = [
-            "                Democratic       Republican            Scattering        Totals",
-            "                 Wesley            Greg",
-            "                 Whitead         Hoversten",
+    @skipUnless(util._import_numpy() is not None, "numpy is not installed")
+    def test_get_column_breaks_numpy(self):
+        cases = COLUMN_BREAK_CASES + [
+            ([], []),
+            ([""], []),
+            (["  Foo\t Bar  ", "Baz", "  \t"], None),
         ]
-        breaks = get_column_breaks(lines)
-        self.assertEqual(breaks, [16, 33, 55, 73])
+        for lines, expected in cases:
+            breaks = util._get_column_breaks_numpy(lines)
+            self.assertEqual(breaks, util._get_column_breaks_python(lines,
+                util.default_whitespace_re))
+            if expected is not None:
+                self.assertEqual(breaks, expected)
 
-        lines = [
-            "                Doug Gross     Steve Sukup   Bob Vander ",
-            "                                               Plaats     Write-In ",
-            "                 Republican    Republican                  Votes         Totals",
-            "                                              Republican",
-        ]
-        breaks = get_column_breaks(lines)
-        self.assertEqual(breaks, [16, 31, 45, 58, 73])
+    def test_column_break_accumulator(self):
+        for lines, expected in COLUMN_BREAK_CASES:
+            accumulator = ColumnBreakAccumulator()
+            for i, line in enumerate(lines):
+                before = accumulator.breaks
+                changed = accumulator.add(line)
+                self.assertEqual(accumulator.breaks,
+                    get_column_breaks(lines[:i + 1]))
+                self.assertEqual(changed, accumulator.breaks != before)
+            self.assertEqual(accumulator.breaks, expected)
+
+    def test_fixed_width_layout(self):
+        layout = FixedWidthLayout([6, 4, 5])
+        self.assertEqual(layout.unpack_line("Adair 12  345"),
+            ["Adair", "12", "345"])
+        self.assertEqual(layout.unpack_line(b"Adams 7"), ["Adams", "7", ""])
+
+        aligned = b"Adair 12  345\nAdams 7      \n"
+        expected = [["Adair", "12", "345"], ["Adams", "7", ""]]
+        self.assertEqual(list(layout.iter_unpack(aligned)), expected)
+        self.assertEqual(list(layout.iter_unpack(memoryview(aligned))),
+            expected)
+
+        # Lines that aren't padded to the full width
+        ragged = b"Adair 12  345\nAdams 7\n"
+        self.assertEqual(list(layout.iter_unpack(ragged)), expected)
 
+    def test_column_splitter(self):
         lines = [
-            "       County        Michael A. Mauro   Matt Schultz           Jake Porter                                            Write-in                           Over Votes     Under         Total"
+            "ADAIR            1,753           1,450         3",
+            "ADAMS            1,000           900",
         ]
-        breaks = get_column_breaks(lines)
-        self.assertEqual(breaks, [7, 21, 40, 63, 118, 153, 168, 182])
+        breaks = [0, 17, 33, 47]
+        splitter = ColumnSplitter(breaks)
+        self.assertEqual(splitter.split(lines[0]),
+            ["ADAIR", "1,753", "1,450", "3"])
+        self.assertEqual(splitter.split(lines[1]),
+            split_line_into_columns(lines[1], breaks))
+        self.assertEqual(splitter.columns(lines), [
+            ["ADAIR", "ADAMS"],
+            ["1,753", "1,000"],
+            ["1,450", "900"],
+            ["3", ""],
+        ])
 
+        splitter = ColumnSplitter(breaks, remove_commas=True)
+        self.assertEqual(splitter.split(lines[0]),
+            ["ADAIR", "1753", "1450", "3"])
+
+    def test_header_layout_cache(self):
+        calls = []
+        def parse(lines):
+            calls.append(lines)
+            return get_column_breaks(lines), [line.strip() for line in lines]
+
+        cache = HeaderLayoutCache(maxsize=2)
+        lines, expected = COLUMN_BREAK_CASES[0]
+        breaks, values = cache.lookup('test', lines, parse)
+        self.assertEqual(breaks, expected)
+        values.append("modified")
+        self.assertEqual(cache.lookup('test', lines, parse)[0], expected)
+        self.assertEqual(cache.lookup('test', lines, parse)[1],
+            [line.strip() for line in lines])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+        # Other namespaces parse the same lines separately
+        cache.lookup('other', lines, parse)
+        cache.lookup('test', COLUMN_BREAK_CASES[1][0], parse)
+        self.assertEqual(len(cache), 2)
+        cache.lookup('test', lines, parse)
+        self.assertEqual(cache.misses, 4)
+
+    def test_infer_column_layout(self):
         lines = [
-            "                                                                                 Total",
-            "            Jim Hahn     Shawn         Write-In       Under Votes   Over Votes",
-            "                       Hamerlinck",
+            "ADAIR      1,753     1,450     3",
+            "ADAMS      1,000       900     1",
+            "ALLAMAKEE  2,000     1,900     2",
+            "APPANOOSE     10 2,000,000     4",
         ]
-        breaks = get_column_breaks(lines)
-        self.assertEqual(breaks, [12, 23, 39, 54, 68, 81])
+        # The last row runs two columns together
+        self.assertEqual(infer_column_layout(lines, tolerance=0),
+            ([0, 11, 31], 1.0))
+        self.assertEqual(infer_column_layout(lines, tolerance=0.25),
+            ([0, 11, 21, 31], 0.75))
+        self.assertEqual(infer_column_layout([]), ([], 1.0))
+
+        # With the default tolerance, one misaligned row in a page of 20
+        # doesn't merge the columns
+        page = lines[:3] * 6 + lines[3:] + lines[:1]
+        self.assertEqual(infer_column_layout(page), ([0, 11, 21, 31], 0.95))
+
+        for lines, expected in COLUMN_BREAK_CASES:
+            self.assertEqual(infer_column_layout(lines), (expected, 1.0))
+
+    def test_vote_converter(self):
+        converter = VoteConverter()
+        self.assertEqual(converter.convert("1,753", 10), 1753)
+        self.assertEqual(converter.convert("0"), 0)
+        self.assertEqual(converter.convert("", 11), "")
+        # Bad values are kept and reported rather than raising
+        self.assertEqual(converter.convert("1,75O", 12), "1,75O")
+        self.assertEqual(converter.failures, [(12, "1,75O")])
+
+        outfile = StringIO()
+        converter.report(outfile, "county.txt")
+        self.assertEqual(outfile.getvalue(),
+            "county.txt: Invalid vote value '1,75O' at line 12\n")
+
+        # int() accepts these, but they aren't vote counts
+        converter = VoteConverter()
+        for value in ("1_000", "-5", " +3 "):
+            self.assertEqual(converter.convert(value, 13), value)
+        self.assertEqual(converter.failures, [(13, "1_000"), (13, "-5"),
+            (13, " +3 ")])